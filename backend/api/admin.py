@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SocialMetric, AppDownload, WebsiteMetric, ManualEntry
+from .models import SocialMetric, AppDownload, WebsiteMetric, ManualEntry, MetricRollup, MetricSnapshot, MetricBaseline, MetricAnomaly, IngestBatch, CollectorWatermark, CollectorRun
 
 
 @admin.register(SocialMetric)
@@ -35,3 +35,58 @@ class ManualEntryAdmin(admin.ModelAdmin):
     search_fields = ['platform', 'metric_name', 'entered_by']
     date_hierarchy = 'collected_at'
     ordering = ['-collected_at']
+
+
+@admin.register(MetricRollup)
+class MetricRollupAdmin(admin.ModelAdmin):
+    list_display = ['source', 'platform', 'field', 'granularity', 'bucket', 'count', 'total', 'last_value']
+    list_filter = ['source', 'granularity', 'platform', 'field']
+    date_hierarchy = 'bucket'
+    ordering = ['-bucket']
+
+
+@admin.register(MetricSnapshot)
+class MetricSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['source', 'platform', 'row_id', 'collected_at', 'updated_at']
+    list_filter = ['source']
+    ordering = ['source', 'platform']
+
+
+@admin.register(MetricBaseline)
+class MetricBaselineAdmin(admin.ModelAdmin):
+    list_display = ['source', 'platform', 'field', 'count', 'mean', 'variance', 'last_collected_at']
+    list_filter = ['source', 'platform', 'field']
+    ordering = ['source', 'platform', 'field']
+
+
+@admin.register(MetricAnomaly)
+class MetricAnomalyAdmin(admin.ModelAdmin):
+    list_display = ['source', 'platform', 'field', 'collected_at', 'value', 'expected', 'score']
+    list_filter = ['source', 'platform', 'field']
+    date_hierarchy = 'collected_at'
+    ordering = ['-collected_at']
+
+
+@admin.register(IngestBatch)
+class IngestBatchAdmin(admin.ModelAdmin):
+    list_display = ['key', 'model', 'row_count', 'created_at']
+    list_filter = ['model']
+    search_fields = ['key']
+    ordering = ['-created_at']
+
+
+@admin.register(CollectorWatermark)
+class CollectorWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['source', 'value', 'updated_at']
+    ordering = ['source']
+
+
+@admin.register(CollectorRun)
+class CollectorRunAdmin(admin.ModelAdmin):
+    list_display = [
+        'source', 'status', 'started_at', 'duration_seconds',
+        'external_seconds', 'retries', 'rows_written', 'error_class',
+    ]
+    list_filter = ['source', 'status', 'error_class']
+    date_hierarchy = 'started_at'
+    ordering = ['-started_at']
@@ -0,0 +1,192 @@
+"""
+Análise de crescimento das séries diárias (seguidores, downloads).
+
+A série de cada plataforma é o último valor de cada dia, lido dos buckets
+diários de MetricRollup (no máximo uma linha por dia, em vez das linhas
+horárias brutas), e processada com NumPy: variação diária, crescimento
+percentual e médias móveis da variação, sem laços em Python sobre os dados.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from .models import MetricRollup
+from .rollups import bucket_start, source_for
+
+MOVING_AVERAGE_WINDOWS = (7, 30)
+
+
+def daily_levels(model, field, start=None, platform=None):
+    """
+    Último valor do campo em cada dia, por plataforma.
+
+    Retorna {platform: (dias datetime64[D], valores float64)} em ordem
+    cronológica; dias sem coleta não aparecem.
+    """
+    rollups = MetricRollup.objects.filter(
+        source=source_for(model),
+        field=field,
+        granularity='day',
+        last_value__isnull=False,
+    )
+    if start is not None:
+        rollups = rollups.filter(bucket__gte=bucket_start(start, 'day'))
+    if platform:
+        rollups = rollups.filter(platform=platform)
+
+    rows = {}
+    for row_platform, bucket, value in rollups.order_by('platform', 'bucket').values_list(
+        'platform', 'bucket', 'last_value'
+    ):
+        timestamps, values = rows.setdefault(row_platform, ([], []))
+        timestamps.append(int(bucket.timestamp()))
+        values.append(value)
+
+    return {
+        row_platform: (_local_days(timestamps), np.array(values, dtype=np.float64))
+        for row_platform, (timestamps, values) in rows.items()
+    }
+
+
+def _local_days(timestamps):
+    # Buckets diários começam à meia-noite local: somar 12h e truncar no dia
+    # UTC dá a data local em qualquer fuso entre -12h e +12h, sem converter
+    # linha a linha com localtime()
+    instants = np.array(timestamps, dtype=np.int64).astype('datetime64[s]')
+    return (instants + np.timedelta64(12, 'h')).astype('datetime64[D]')
+
+
+def moving_average(values, window):
+    """Média móvel simples; NaN onde a janela não tem `window` valores válidos"""
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        window_sums = sums[window:] - sums[:-window]
+        window_counts = counts[window:] - counts[:-window]
+        result[window - 1:] = np.where(window_counts == window, window_sums / window, np.nan)
+    return result
+
+
+def growth(days, values, windows=MOVING_AVERAGE_WINDOWS):
+    """
+    Indicadores diários de uma série de níveis (seguidores, downloads acumulados).
+
+    Dias sem coleta entre o primeiro e o último recebem o valor do dia
+    anterior (`filled`), para que a variação de um intervalo sem dados não
+    apareça inteira no dia seguinte a ele. Retorna um dict de arrays
+    alinhados pelo calendário contínuo de dias.
+    """
+    calendar = np.arange(days[0], days[-1] + np.timedelta64(1, 'D'))
+    positions = (days - days[0]).astype(np.int64)
+
+    filled = np.ones(len(calendar), dtype=bool)
+    filled[positions] = False
+
+    # Preenche os dias sem coleta com o último valor conhecido
+    source = np.zeros(len(calendar), dtype=np.int64)
+    source[positions] = np.arange(len(values))
+    np.maximum.accumulate(source, out=source)
+    level = values[source]
+
+    previous = np.concatenate(([np.nan], level[:-1]))
+    net_change = level - previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth_pct = np.where(previous != 0, net_change / previous * 100, np.nan)
+
+    result = {
+        'date': calendar,
+        'value': level,
+        'net_change': net_change,
+        'growth_pct': growth_pct,
+        'filled': filled,
+    }
+    for window in windows:
+        result[f'net_change_ma{window}'] = moving_average(net_change, window)
+    return result
+
+
+def summarize(indicators):
+    """
+    Variação total, crescimento e melhor/pior dia do intervalo.
+
+    O valor inicial é o do fim do dia anterior ao intervalo (quando
+    conhecido), de modo que a variação total é a soma das diárias.
+    """
+    value = indicators['value']
+    net_change = indicators['net_change']
+    dates = indicators['date']
+
+    first = value[0] if np.isnan(net_change[0]) else value[0] - net_change[0]
+    last = value[-1]
+    has_change = not np.all(np.isnan(net_change))
+    return {
+        'start_value': first,
+        'end_value': last,
+        'change': last - first,
+        'growth_pct': (last - first) / first * 100 if first else None,
+        'avg_daily_change': np.nanmean(net_change) if has_change else None,
+        'best_day': str(dates[np.nanargmax(net_change)]) if has_change else None,
+        'worst_day': str(dates[np.nanargmin(net_change)]) if has_change else None,
+    }
+
+
+def _clean(value):
+    """Converte escalares do NumPy para JSON (NaN vira None)"""
+    if value is None:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _column(values):
+    if values.dtype.kind == 'M':
+        return values.astype(str).tolist()
+    if values.dtype.kind == 'f':
+        column = values.astype(object)
+        column[np.isnan(values)] = None
+        return column.tolist()
+    return values.tolist()
+
+
+def _points(indicators):
+    names = list(indicators)
+    columns = [_column(values) for values in indicators.values()]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def growth_by_platform(model, field, start=None, platform=None, windows=MOVING_AVERAGE_WINDOWS):
+    """
+    Indicadores diários e resumo de cada plataforma a partir de `start`.
+
+    Carrega `max(windows)` dias antes de `start`, para que a variação e as
+    médias móveis já estejam definidas no primeiro dia do intervalo.
+    """
+    history_start = start - timedelta(days=max(windows)) if start else None
+    start_day = str(timezone.localtime(start).date()) if start else None
+
+    result = []
+    for row_platform, (days, values) in daily_levels(model, field, history_start, platform).items():
+        indicators = growth(days, values, windows)
+
+        if start_day is not None:
+            in_period = indicators['date'] >= np.datetime64(start_day)
+            if not in_period.any():
+                continue
+            period_indicators = {name: column[in_period] for name, column in indicators.items()}
+        else:
+            period_indicators = indicators
+
+        result.append({
+            'platform': row_platform,
+            'summary': {key: _clean(value) for key, value in summarize(period_indicators).items()},
+            'points': _points(period_indicators),
+        })
+
+    return result
@@ -0,0 +1,328 @@
+"""
+Detecção de anomalias nas métricas no momento da gravação.
+
+Cada (fonte, plataforma, campo) mantém em MetricBaseline uma média e uma
+variância com pesos exponenciais (EWMA): cada linha nova atualiza o estado
+em O(1), sem reler o histórico. Um valor a mais de ANOMALY_THRESHOLD
+desvios padrão da média, depois de ANOMALY_MIN_SAMPLES amostras, é
+registrado em MetricAnomaly. Desvios menores que
+ANOMALY_MIN_RELATIVE_DEVIATION do valor esperado nunca são anômalos: em
+séries quase constantes (número de publicações) a variância fica perto de
+zero e uma única publicação nova pareceria um desvio enorme.
+
+Nos campos de nível (LEVEL_FIELDS: seguidores, downloads acumulados...) a
+série observada é a variação entre coletas consecutivas, já que o valor
+cresce sempre; um seguidores = 0 vindo de uma resposta mal interpretada
+aparece como uma queda de milhares de desvios padrão.
+
+O desvio usado para atualizar o estado é limitado ao limiar, para que um
+único valor absurdo não infle a variância e esconda as anomalias seguintes;
+mudanças de patamar persistentes ainda são absorvidas em poucas coletas.
+
+Linhas anteriores à última processada (reprocessamentos, correções) não
+alteram o estado; `rebuild` recalcula tudo a partir do histórico, processando
+todas as séries da fonte ao mesmo tempo com NumPy.
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+from itertools import groupby, islice
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from . import cache
+from .models import MetricAnomaly, MetricBaseline
+from .rollups import has_platform, source_for
+
+# Linhas lidas por vez do histórico em `rebuild`
+HISTORY_CHUNK_SIZE = 5000
+
+STATE_FIELDS = ['count', 'mean', 'variance', 'last_value', 'last_collected_at', 'updated_at']
+
+
+def _step(baseline, value, level):
+    """
+    Atualiza o estado com um valor; retorna (esperado, score) se for anômalo.
+    """
+    offset = 0.0
+    previous = baseline.last_value
+    baseline.last_value = value
+    if level:
+        if previous is None:
+            return None
+        offset = previous
+        value -= previous
+
+    if baseline.count == 0:
+        baseline.count = 1
+        baseline.mean = value
+        baseline.variance = 0.0
+        return None
+
+    diff = value - baseline.mean
+    std = math.sqrt(baseline.variance)
+    limit = settings.ANOMALY_THRESHOLD * std
+
+    expected = offset + baseline.mean
+    tolerance = settings.ANOMALY_MIN_RELATIVE_DEVIATION * abs(expected)
+
+    anomaly = None
+    if (
+        baseline.count >= settings.ANOMALY_MIN_SAMPLES
+        and std > 0
+        and abs(diff) > max(limit, tolerance)
+    ):
+        anomaly = (expected, diff / std)
+        diff = math.copysign(limit, diff)
+
+    alpha = settings.ANOMALY_ALPHA
+    increment = alpha * diff
+    baseline.mean += increment
+    baseline.variance = (1 - alpha) * (baseline.variance + diff * increment)
+    baseline.count += 1
+    return anomaly
+
+
+def observe(model, instances):
+    """Atualiza as linhas de base com as linhas gravadas e registra as anomalias"""
+    if not settings.ANOMALY_DETECTION_ENABLED or not instances:
+        return 0
+
+    source = source_for(model)
+    rows = sorted(instances, key=lambda instance: instance.collected_at)
+    platforms = {getattr(instance, 'platform', '') for instance in rows}
+
+    baselines = {
+        (baseline.platform, baseline.field): baseline
+        for baseline in MetricBaseline.objects.filter(source=source, platform__in=platforms)
+    }
+    changed = {}
+    anomalies = []
+
+    for instance in rows:
+        platform = getattr(instance, 'platform', '')
+        for field in model.ROLLUP_FIELDS:
+            value = getattr(instance, field)
+            if value is None:
+                continue
+
+            key = (platform, field)
+            baseline = baselines.get(key)
+            if baseline is None:
+                baseline = baselines[key] = MetricBaseline(source=source, platform=platform, field=field)
+            elif baseline.last_collected_at and instance.collected_at <= baseline.last_collected_at:
+                continue
+
+            anomaly = _step(baseline, float(value), field in model.LEVEL_FIELDS)
+            baseline.last_collected_at = instance.collected_at
+            changed[key] = baseline
+
+            if anomaly:
+                expected, score = anomaly
+                anomalies.append(MetricAnomaly(
+                    source=source,
+                    platform=platform,
+                    field=field,
+                    collected_at=instance.collected_at,
+                    value=value,
+                    expected=expected,
+                    score=score,
+                ))
+
+    MetricBaseline.objects.bulk_create(
+        list(changed.values()),
+        update_conflicts=True,
+        unique_fields=['source', 'platform', 'field'],
+        update_fields=STATE_FIELDS,
+    )
+    if anomalies:
+        MetricAnomaly.objects.bulk_create(anomalies, ignore_conflicts=True)
+        cache.invalidate('anomalies')
+
+    return len(anomalies)
+
+
+def _level_changes(values):
+    """
+    Variação de cada coluna em relação ao último valor não nulo anterior.
+
+    Retorna (variações, valores anteriores); NaN onde não há valor ou
+    anterior.
+    """
+    rows = np.arange(len(values))[:, None]
+    last_seen = np.where(np.isnan(values), -1, rows)
+    np.maximum.accumulate(last_seen, axis=0, out=last_seen)
+
+    previous_index = np.vstack([np.full((1, values.shape[1]), -1), last_seen[:-1]])
+    columns = np.broadcast_to(np.arange(values.shape[1]), values.shape)
+    previous = np.where(previous_index >= 0, values[np.maximum(previous_index, 0), columns], np.nan)
+    return values - previous, previous
+
+
+def _scan(observed, offsets, alpha, threshold, min_samples, min_relative_deviation):
+    """
+    Aplica a mesma atualização de `_step` a todas as séries (colunas) de uma
+    vez, linha a linha. Retorna o estado final e, para cada ponto anômalo,
+    (linha, coluna, valor esperado, score).
+    """
+    series = observed.shape[1]
+    count = np.zeros(series, dtype=np.int64)
+    mean = np.zeros(series)
+    variance = np.zeros(series)
+    flagged = []
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for row, values in enumerate(observed):
+            valid = ~np.isnan(values)
+            first = valid & (count == 0)
+            update = valid & (count > 0)
+
+            diff = values - mean
+            std = np.sqrt(variance)
+            limit = threshold * std
+            expected = offsets[row] + mean
+            tolerance = min_relative_deviation * np.abs(expected)
+            anomalous = (
+                update
+                & (count >= min_samples)
+                & (std > 0)
+                & (np.abs(diff) > np.maximum(limit, tolerance))
+            )
+
+            for column in np.flatnonzero(anomalous):
+                flagged.append((row, column, expected[column], diff[column] / std[column]))
+
+            diff = np.where(anomalous, np.copysign(limit, diff), diff)
+            increment = alpha * diff
+            mean = np.where(update, mean + increment, np.where(first, values, mean))
+            variance = np.where(update, (1 - alpha) * (variance + diff * increment), variance)
+            count += valid
+
+    return count, mean, variance, flagged
+
+
+def _histories(model, fields, columns):
+    """
+    Histórico da fonte como matriz (linha na série da plataforma x
+    plataforma·campo), preenchida em streaming.
+
+    As linhas são lidas com iterator() em blocos de HISTORY_CHUNK_SIZE e
+    copiadas direto para a matriz, pré-alocada com a contagem de cada
+    plataforma; nenhuma lista com todas as linhas é montada. Retorna
+    (plataformas, instantes de cada plataforma em datetime64[us] UTC, matriz).
+    """
+    # Linhas gravadas durante a leitura ficam de fora da contagem e do streaming
+    last_id = model.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    queryset = model.objects.filter(id__lte=last_id)
+
+    if columns:
+        counts = dict(queryset.order_by().values_list('platform').annotate(rows=Count('id')))
+    else:
+        counts = {'': queryset.count()}
+    counts = {platform: rows for platform, rows in counts.items() if rows}
+    platforms = sorted(counts)
+
+    raw = np.full((max(counts.values(), default=0), len(platforms) * len(fields)), np.nan)
+    times = {platform: np.empty(rows, dtype='datetime64[us]') for platform, rows in counts.items()}
+    filled = dict.fromkeys(platforms, 0)
+    column = {platform: index * len(fields) for index, platform in enumerate(platforms)}
+
+    rows = (
+        queryset.order_by(*columns, 'collected_at', 'id')
+        .values_list(*columns, 'collected_at', *fields)
+        .iterator(chunk_size=HISTORY_CHUNK_SIZE)
+    )
+    while True:
+        chunk = list(islice(rows, HISTORY_CHUNK_SIZE))
+        if not chunk:
+            break
+        for platform, run in groupby(chunk, key=lambda row: row[0] if columns else ''):
+            run = list(run)
+            # Removidas durante a leitura: a contagem pode sobrar, nunca faltar
+            start, stop = filled[platform], min(filled[platform] + len(run), len(times[platform]))
+            run = run[:stop - start]
+            times[platform][start:stop] = [
+                row[len(columns)].astimezone(dt_timezone.utc).replace(tzinfo=None) for row in run
+            ]
+            # None vira NaN
+            raw[start:stop, column[platform]:column[platform] + len(fields)] = np.array(
+                [row[len(columns) + 1:] for row in run], dtype=np.float64
+            )
+            filled[platform] = stop
+
+    return platforms, times, raw
+
+
+def _aware(value):
+    return value.astype(datetime).replace(tzinfo=dt_timezone.utc)
+
+
+def rebuild(model):
+    """
+    Recalcula linhas de base e anomalias da fonte a partir do histórico.
+
+    Todas as séries (plataforma x campo) são montadas como colunas de uma
+    matriz, indexada pela posição da linha na série da plataforma, e
+    percorridas juntas. Retorna o número de anomalias registradas.
+    """
+    source = source_for(model)
+    fields = model.ROLLUP_FIELDS
+    columns = ['platform'] if has_platform(model) else []
+
+    platforms, times, raw = _histories(model, fields, columns)
+
+    level = np.tile([field in model.LEVEL_FIELDS for field in fields], len(platforms))
+    changes, previous = _level_changes(raw)
+    observed = np.where(level, changes, raw)
+    offsets = np.where(level, previous, 0.0)
+
+    count, mean, variance, flagged = _scan(
+        observed,
+        offsets,
+        settings.ANOMALY_ALPHA,
+        settings.ANOMALY_THRESHOLD,
+        settings.ANOMALY_MIN_SAMPLES,
+        settings.ANOMALY_MIN_RELATIVE_DEVIATION,
+    )
+
+    baselines = []
+    for column in range(raw.shape[1]):
+        platform = platforms[column // len(fields)]
+        history = raw[:, column]
+        valid = np.flatnonzero(~np.isnan(history))
+        if not len(valid):
+            continue
+        baselines.append(MetricBaseline(
+            source=source,
+            platform=platform,
+            field=fields[column % len(fields)],
+            count=int(count[column]),
+            mean=float(mean[column]),
+            variance=float(variance[column]),
+            last_value=float(history[valid[-1]]),
+            last_collected_at=_aware(times[platform][valid[-1]]),
+        ))
+
+    anomalies = [
+        MetricAnomaly(
+            source=source,
+            platform=platforms[column // len(fields)],
+            field=fields[column % len(fields)],
+            collected_at=_aware(times[platforms[column // len(fields)]][row]),
+            value=float(raw[row, column]),
+            expected=float(expected),
+            score=float(score),
+        )
+        for row, column, expected, score in flagged
+    ]
+
+    with transaction.atomic():
+        MetricBaseline.objects.filter(source=source).delete()
+        MetricAnomaly.objects.filter(source=source).delete()
+        MetricBaseline.objects.bulk_create(baselines, batch_size=settings.BULK_INSERT_BATCH_SIZE)
+        MetricAnomaly.objects.bulk_create(anomalies, batch_size=settings.BULK_INSERT_BATCH_SIZE)
+        cache.invalidate('anomalies')
+
+    return len(anomalies)
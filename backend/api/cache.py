@@ -0,0 +1,167 @@
+"""
+Cache das respostas dos endpoints do dashboard.
+
+Cada fonte de dados (social, app, website, manual) tem um contador de geração
+no cache. A chave de uma resposta inclui as gerações das fontes de que ela
+depende; qualquer gravação troca a geração da fonte e as respostas antigas
+simplesmente deixam de ser encontradas (e expiram sozinhas).
+
+Para evitar estouro de recálculo, só a primeira requisição que encontra o
+cache vazio calcula a resposta; as demais aguardam o resultado dela.
+
+As mesmas gerações servem de validadores HTTP (ETag / Last-Modified): um GET
+condicional cujas fontes não mudaram responde 304 sem consultar o banco.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags, parse_http_date_safe, quote_etag
+from rest_framework.response import Response
+
+from . import routers
+
+KEY_PREFIX = 'dashboard'
+
+# Tempo máximo de posse do lock de recálculo (segundos)
+LOCK_TIMEOUT = 30
+
+# Tempo que as requisições concorrentes esperam pelo recálculo (segundos)
+LOCK_WAIT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _generation_key(source):
+    return f'{KEY_PREFIX}:generation:{source}'
+
+
+def generations(sources):
+    """Gerações atuais das fontes informadas (cria as que não existem)"""
+    keys = [_generation_key(source) for source in sources]
+    values = cache.get_many(keys)
+
+    for key in keys:
+        if key not in values:
+            cache.add(key, time.time_ns(), timeout=None)
+            values[key] = cache.get(key)
+
+    return [values[key] for key in keys]
+
+
+def invalidate(source):
+    """Descarta as respostas que dependem da fonte após o commit da gravação"""
+    def commit():
+        cache.set(_generation_key(source), time.time_ns(), timeout=None)
+        # A resposta recalculada não pode vir de uma réplica ainda atrasada
+        routers.record_write()
+
+    transaction.on_commit(commit)
+
+
+def response_key(request, sources):
+    params = sorted(request.query_params.lists())
+    raw = repr((request.path, params, generations(sources)))
+    return f'{KEY_PREFIX}:response:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def memoize(name, sources, compute, timeout=None):
+    """
+    Resultado de `compute()` guardado enquanto as fontes não mudarem.
+
+    `name` identifica o cálculo e seus parâmetros (qualquer valor com repr
+    estável).
+    """
+    raw = repr((name, generations(sources)))
+    key = f'{KEY_PREFIX}:value:{hashlib.md5(raw.encode()).hexdigest()}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout if timeout is not None else settings.DASHBOARD_CACHE_TIMEOUT)
+    return value
+
+
+class NotModified(Exception):
+    """Os validadores da requisição condicional ainda valem (304)"""
+
+
+def validators(request, sources):
+    """
+    Retorna (ETag, Last-Modified em segundos) da resposta às fontes.
+
+    A geração muda a cada gravação (inclusive atualizações e remoções, que
+    não mexem no maior collected_at). Os validadores também mudam a cada
+    DASHBOARD_CACHE_TIMEOUT, pois filtros por período (`period=day`)
+    dependem do relógio e não só das gravações.
+    """
+    values = generations(sources)
+    window = settings.DASHBOARD_CACHE_TIMEOUT
+    window_start = int(time.time()) // window * window
+
+    params = sorted(request.query_params.lists())
+    raw = repr((request.path, params, request.accepted_renderer.format, values, window_start))
+    etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+    last_modified = max([value // 10 ** 9 for value in values] + [window_start])
+    return etag, last_modified
+
+
+def not_modified(request, etag, last_modified):
+    """Se a requisição condicional pode ser respondida com 304"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        # If-None-Match prevalece sobre If-Modified-Since (RFC 9110)
+        etags = [value.removeprefix('W/') for value in parse_etags(if_none_match)]
+        return etag in etags or '*' in etags
+
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since'))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def cached_response(*sources, timeout=None):
+    """
+    Decorator para actions de ViewSet cujas respostas dependem das fontes.
+
+    Uso:
+        @action(detail=False, methods=['get'])
+        @cached_response('social', 'app')
+        def summary(self, request): ...
+
+    Sem fontes explícitas, usa o atributo `cache_sources` do ViewSet.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            key = response_key(request, sources or self.cache_sources)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            lock_key = f'{key}:lock'
+            owner = cache.add(lock_key, 1, LOCK_TIMEOUT)
+            if not owner:
+                # Outra requisição já está recalculando esta resposta
+                deadline = time.monotonic() + LOCK_WAIT
+                while time.monotonic() < deadline:
+                    time.sleep(LOCK_POLL_INTERVAL)
+                    data = cache.get(key)
+                    if data is not None:
+                        return Response(data)
+
+            try:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(
+                        key,
+                        response.data,
+                        timeout if timeout is not None else settings.DASHBOARD_CACHE_TIMEOUT,
+                    )
+                return response
+            finally:
+                if owner:
+                    cache.delete(lock_key)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,138 @@
+"""
+Clientes das APIs externas usados pelos coletores.
+
+Cada processo do worker cria os clientes uma única vez e reaproveita seus
+pools de conexão entre execuções. Toda chamada tem timeout e é repetida com
+backoff exponencial com jitter quando a falha é transitória (rede, 429, 5xx).
+
+Os workers do Celery usam prefork (um processo por tarefa simultânea), então
+os clientes não são compartilhados entre threads.
+"""
+import random
+import time
+from functools import lru_cache
+
+import requests
+import tweepy
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import runs
+
+
+class TimeoutSession(requests.Session):
+    """Session com timeout padrão em todas as requisições"""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', (settings.COLLECTOR_CONNECT_TIMEOUT, settings.COLLECTOR_READ_TIMEOUT))
+        return super().request(method, url, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def http_session():
+    session = TimeoutSession()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def backoff_delay(attempt):
+    """Backoff exponencial com jitter completo (0 .. base * 2^tentativa)"""
+    ceiling = min(settings.COLLECTOR_BACKOFF_MAX, settings.COLLECTOR_BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+def _status_code(exc):
+    # requests / tweepy
+    response = getattr(exc, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) is not None:
+        return response.status_code
+    # googleapiclient (httplib2)
+    resp = getattr(exc, 'resp', None)
+    if resp is not None and getattr(resp, 'status', None) is not None:
+        return int(resp.status)
+    # google.api_core (gRPC)
+    code = getattr(exc, 'code', None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc):
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)):
+        return True
+    status = _status_code(exc)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def call_with_retry(func, *args, **kwargs):
+    """
+    Executa func repetindo falhas transitórias até COLLECTOR_MAX_RETRIES vezes.
+
+    O tempo das tentativas (sem as esperas) e o número de repetições entram
+    no registro da execução corrente do coletor (CollectorRun).
+    """
+    attempt = 0
+    elapsed = 0.0
+    while True:
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as exc:
+            elapsed += time.perf_counter() - started
+            if attempt >= settings.COLLECTOR_MAX_RETRIES or not is_retryable(exc):
+                runs.record_call(elapsed, attempt)
+                raise
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+        else:
+            runs.record_call(elapsed + time.perf_counter() - started, attempt)
+            return result
+
+
+def get(url, **kwargs):
+    """GET com retry; respostas 429/5xx viram exceção para acionar nova tentativa"""
+    def _get():
+        response = http_session().get(url, **kwargs)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        return response
+
+    return call_with_retry(_get)
+
+
+@lru_cache(maxsize=None)
+def twitter_client(bearer_token):
+    client = tweepy.Client(bearer_token=bearer_token)
+    # Reaproveita o pool de conexões (e o timeout) da sessão compartilhada
+    client.session = http_session()
+    return client
+
+
+@lru_cache(maxsize=None)
+def youtube_service(api_key):
+    import httplib2
+    from googleapiclient.discovery import build
+
+    http = httplib2.Http(timeout=settings.COLLECTOR_READ_TIMEOUT)
+    return build('youtube', 'v3', developerKey=api_key, http=http, cache_discovery=False)
+
+
+@lru_cache(maxsize=None)
+def android_publisher_service(service_account_file):
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+
+    credentials = service_account.Credentials.from_service_account_file(
+        service_account_file,
+        scopes=['https://www.googleapis.com/auth/androidpublisher']
+    )
+    return build('androidpublisher', 'v3', credentials=credentials, cache_discovery=False)
+
+
+@lru_cache(maxsize=None)
+def analytics_client(credentials_file):
+    from google.analytics.data_v1beta import BetaAnalyticsDataClient
+    from google.oauth2 import service_account
+
+    credentials = service_account.Credentials.from_service_account_file(credentials_file)
+    return BetaAnalyticsDataClient(credentials=credentials)
@@ -0,0 +1,200 @@
+"""
+Exportação do histórico de métricas em streaming (CSV, NDJSON, Parquet).
+
+As linhas são lidas com values_list().iterator(chunk_size=...): no
+PostgreSQL isso usa um cursor do lado do servidor, e nem o banco nem a
+aplicação montam o resultado inteiro na memória (com
+DISABLE_SERVER_SIDE_CURSORS, uma consulta por bloco, paginada por
+collected_at/id). Cada bloco de
+EXPORT_CHUNK_SIZE linhas é codificado e enviado antes do próximo ser
+lido; o uso de memória não depende do tamanho da exportação.
+"""
+import csv
+import io
+from itertools import islice
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def export_fields(model):
+    """Colunas exportadas: todos os campos do modelo, na ordem da tabela"""
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _keyset_chunks(queryset, fields):
+    # Sem cursores do lado do servidor (pgbouncer em modo transaction), cada
+    # bloco é uma consulta própria a partir do (collected_at, id) do anterior
+    time_index, id_index = fields.index('collected_at'), fields.index('id')
+    page = queryset
+    while True:
+        chunk = list(page.values_list(*fields)[:settings.EXPORT_CHUNK_SIZE])
+        if not chunk:
+            return
+        yield chunk
+        collected_at, pk = chunk[-1][time_index], chunk[-1][id_index]
+        page = queryset.filter(
+            Q(collected_at__gt=collected_at) | Q(collected_at=collected_at, id__gt=pk)
+        )
+
+
+def _chunks(queryset, fields):
+    queryset = queryset.order_by('collected_at', 'id')
+    if connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from _keyset_chunks(queryset, fields)
+        return
+
+    rows = queryset.values_list(*fields).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    while True:
+        chunk = list(islice(rows, settings.EXPORT_CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _model_fields(queryset, fields):
+    by_name = {field.attname: field for field in queryset.model._meta.concrete_fields}
+    return [by_name[name] for name in fields]
+
+
+def _isoformat_rows(chunk, positions):
+    # Só as colunas de data/hora precisam de conversão
+    for row in chunk:
+        row = list(row)
+        for position in positions:
+            if row[position] is not None:
+                row[position] = row[position].isoformat()
+        yield row
+
+
+def csv_stream(queryset, fields):
+    positions = [
+        position
+        for position, field in enumerate(_model_fields(queryset, fields))
+        if field.get_internal_type() == 'DateTimeField'
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+
+    for chunk in _chunks(queryset, fields):
+        writer.writerows(_isoformat_rows(chunk, positions))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        # Só o cabeçalho (nenhuma linha)
+        yield buffer.getvalue().encode()
+
+
+def ndjson_stream(queryset, fields):
+    for chunk in _chunks(queryset, fields):
+        yield b''.join(
+            orjson.dumps(dict(zip(fields, row))) + b'\n'
+            for row in chunk
+        )
+
+
+class _Pipe(io.RawIOBase):
+    """Arquivo só de escrita cujo conteúdo é recolhido a cada bloco"""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_type(field):
+    import pyarrow as pa
+
+    internal_type = field.get_internal_type()
+    if internal_type == 'DateTimeField':
+        return pa.timestamp('us', tz='UTC')
+    if internal_type == 'FloatField':
+        return pa.float64()
+    if internal_type.endswith('IntegerField') or internal_type.endswith('AutoField'):
+        return pa.int64()
+    return pa.string()
+
+
+def parquet_stream(queryset, fields):
+    """Um row group por bloco, enviado assim que é escrito"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (field.attname, _arrow_type(field))
+        for field in _model_fields(queryset, fields)
+    ])
+
+    pipe = _Pipe()
+    writer = pq.ParquetWriter(pipe, schema, compression='zstd')
+    for chunk in _chunks(queryset, fields):
+        columns = zip(*chunk)
+        writer.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema,
+        ))
+        yield pipe.drain()
+
+    writer.close()
+    yield pipe.drain()
+
+
+STREAMS = {
+    'csv': csv_stream,
+    'ndjson': ndjson_stream,
+    'parquet': parquet_stream,
+}
+
+
+def stream(queryset, file_format):
+    """Iterador de bytes da exportação do queryset no formato pedido"""
+    # Fixa o banco agora: o streaming continua depois que a requisição deixou
+    # o middleware que escolhe a réplica
+    queryset = queryset.using(queryset.db)
+    return STREAMS[file_format](queryset, export_fields(queryset.model))
+
+
+async def async_stream(chunks):
+    """
+    Consome o iterador síncrono bloco a bloco numa thread (ASGI).
+
+    Entregar um iterador síncrono ao StreamingHttpResponse no ASGI faria o
+    Django ler a exportação inteira para a memória antes de enviar.
+    """
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await next_chunk(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
@@ -0,0 +1,180 @@
+"""
+Projeção das séries diárias de nível (seguidores, downloads acumulados).
+
+Os modelos são ajustados sobre o último valor de cada dia (os mesmos buckets
+diários de `analytics`) dos últimos `history` dias:
+
+- linear: reta de mínimos quadrados;
+- holt: suavização exponencial com tendência (Holt). Os parâmetros de
+  suavização são escolhidos numa grade, com todas as combinações avançando
+  juntas em NumPy e a de menor erro quadrático de um passo à frente vencendo.
+
+O ajuste devolve só alguns números (nível e tendência no último dia, desvio
+dos resíduos), que ficam no cache enquanto a fonte não receber dados novos:
+recarregar o dashboard, mudar o horizonte ou a meta não refaz o ajuste.
+"""
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from . import analytics, cache
+from .rollups import source_for
+
+METHODS = ('linear', 'holt')
+
+# Grade dos parâmetros de suavização do Holt (nível x tendência)
+HOLT_ALPHAS = np.linspace(0.05, 1.0, 20)
+HOLT_BETAS = np.linspace(0.0, 0.5, 11)
+
+# Quantil normal do intervalo de 95%
+INTERVAL_Z = 1.96
+
+# Metas mais distantes que isso são tratadas como não alcançadas
+MAX_TARGET_DAYS = 3650
+
+
+def fit_linear(values):
+    """Reta de mínimos quadrados; nível e tendência no último dia"""
+    days = np.arange(len(values), dtype=np.float64)
+    slope, intercept = np.polyfit(days, values, 1)
+    residuals = values - (intercept + slope * days)
+    return {
+        'level': intercept + slope * days[-1],
+        'trend': slope,
+        'sigma': math.sqrt(np.sum(residuals ** 2) / max(len(values) - 2, 1)),
+        # Termos do intervalo de predição da regressão
+        'mean_day': days.mean(),
+        'sxx': np.sum((days - days.mean()) ** 2),
+    }
+
+
+def fit_holt(values):
+    """
+    Holt com a combinação (alpha, beta) da grade de menor erro de um passo.
+
+    Cada coluna dos arrays é uma combinação; o laço é só sobre os dias.
+    """
+    alphas, betas = (grid.ravel() for grid in np.meshgrid(HOLT_ALPHAS, HOLT_BETAS))
+    level = np.full(len(alphas), values[0])
+    trend = np.full(len(alphas), values[1] - values[0])
+    sse = np.zeros(len(alphas))
+
+    for value in values[1:]:
+        predicted = level + trend
+        error = value - predicted
+        sse += error ** 2
+        level = predicted + alphas * error
+        trend = trend + alphas * betas * error
+
+    best = int(np.argmin(sse))
+    return {
+        'alpha': alphas[best],
+        'beta': betas[best],
+        'level': level[best],
+        'trend': trend[best],
+        'sigma': math.sqrt(sse[best] / max(len(values) - 1, 1)),
+    }
+
+
+FITS = {'linear': fit_linear, 'holt': fit_holt}
+
+
+def fit(model, field, method, history, platform=None):
+    """
+    Parâmetros ajustados por plataforma: {platform: {...}}.
+
+    Guardados no cache até a próxima gravação da fonte (ou a troca do dia,
+    que move a janela de histórico).
+    """
+    source = source_for(model)
+    today = timezone.localdate()
+
+    def compute():
+        start = timezone.now() - timedelta(days=history)
+        fitted = {}
+        for row_platform, (days, values) in analytics.daily_levels(model, field, start, platform).items():
+            indicators = analytics.growth(days, values, windows=())
+            levels = indicators['value']
+            if len(levels) < 3:
+                continue
+            params = {
+                key: float(value)
+                for key, value in FITS[method](levels).items()
+            }
+            params['samples'] = len(levels)
+            params['fitted_through'] = str(indicators['date'][-1])
+            fitted[row_platform] = params
+        return fitted
+
+    return cache.memoize(
+        ('forecast', source, field, method, history, platform, str(today)),
+        [source],
+        compute,
+        timeout=settings.FORECAST_CACHE_TIMEOUT,
+    )
+
+
+def _spread(method, params, steps):
+    """Desvio padrão da previsão `steps` dias à frente"""
+    sigma = params['sigma']
+    if method == 'linear':
+        position = params['samples'] - 1 + steps - params['mean_day']
+        return sigma * np.sqrt(1 + 1 / params['samples'] + position ** 2 / params['sxx'])
+
+    # Variância do Holt: sigma² * (1 + soma_{j<h} alpha² (1 + j beta)²)
+    terms = (params['alpha'] * (1 + np.arange(1, len(steps)) * params['beta'])) ** 2
+    return sigma * np.sqrt(1 + np.concatenate(([0.0], np.cumsum(terms))))
+
+
+def project(method, params, horizon):
+    """Pontos previstos (com intervalo de 95%) para os próximos `horizon` dias"""
+    steps = np.arange(1, horizon + 1)
+    values = params['level'] + params['trend'] * steps
+    margin = INTERVAL_Z * _spread(method, params, steps)
+    dates = np.datetime64(params['fitted_through']) + steps.astype('timedelta64[D]')
+
+    return [
+        {'date': date, 'value': value, 'lower': value - delta, 'upper': value + delta}
+        for date, value, delta in zip(
+            dates.astype(str).tolist(),
+            values.tolist(),
+            margin.tolist(),
+        )
+    ]
+
+
+def target_date(params, target):
+    """Dia em que a tendência ajustada alcança `target` (None se não alcança)"""
+    gap = target - params['level']
+    if not math.isfinite(gap):
+        return None
+    if gap == 0:
+        days = 0
+    elif params['trend'] * gap > 0:
+        days = math.ceil(gap / params['trend'])
+    else:
+        return None
+
+    if days > MAX_TARGET_DAYS:
+        return None
+    return str(np.datetime64(params['fitted_through']) + np.timedelta64(days, 'D'))
+
+
+def forecast_by_platform(model, field, method, horizon, history, platform=None, target=None):
+    """Modelo ajustado, pontos previstos e data da meta de cada plataforma"""
+    result = []
+    for row_platform, params in fit(model, field, method, history, platform).items():
+        result.append({
+            'platform': row_platform,
+            'model': {
+                key: value
+                for key, value in params.items()
+                if key not in ('mean_day', 'sxx')
+            },
+            'target_date': target_date(params, target) if target is not None else None,
+            'points': project(method, params, horizon),
+        })
+    return result
@@ -0,0 +1,224 @@
+"""
+Importação de entradas manuais a partir de CSV.
+
+O arquivo é lido em streaming (linha a linha, sem carregar tudo na memória),
+e as linhas são validadas e gravadas em blocos de MANUAL_IMPORT_BATCH_SIZE:
+cada bloco é uma transação com bulk_insert (COPY no PostgreSQL para blocos
+grandes). A validação é feita direto sobre os valores do CSV, sem um
+serializer do DRF por linha, para que um arquivo de 100 mil linhas leve
+segundos.
+
+Linhas inválidas não interrompem a importação: são ignoradas e listadas no
+relatório, com o número da linha no arquivo e os erros por campo.
+"""
+import csv
+import io
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .ingest import bulk_insert
+from .models import ManualEntry
+
+# Campos importados; `mapping` indica a coluna do CSV de cada um
+FIELDS = ('platform', 'metric_name', 'metric_value', 'collected_at', 'notes')
+REQUIRED = ('platform', 'metric_name', 'metric_value', 'collected_at')
+
+INTEGER_MIN, INTEGER_MAX = -2 ** 31, 2 ** 31 - 1
+
+# Primeiros bytes usados para detectar o separador (`,`, `;` ou tab)
+SNIFF_BYTES = 4096
+
+
+class InvalidFile(Exception):
+    """
+    Arquivo que não pode ser importado (colunas, codificação, CSV mal
+    formado). `report` traz o que já foi gravado até o erro.
+    """
+
+    def __init__(self, message, report=None):
+        super().__init__(message)
+        self.report = report
+
+
+def _reader(upload):
+    text = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+    try:
+        sample = text.read(SNIFF_BYTES)
+    except UnicodeDecodeError:
+        raise InvalidFile('File must be UTF-8 encoded')
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    text.seek(0)
+    return csv.DictReader(text, dialect=dialect)
+
+
+def _integer(raw):
+    value = raw.strip().replace(' ', '')
+    try:
+        return int(value)
+    except ValueError:
+        number = float(value)
+        if not number.is_integer():
+            raise ValueError
+        return int(number)
+
+
+def _datetime(raw, tz):
+    raw = raw.strip()
+    value = parse_datetime(raw)
+    if value is None:
+        day = parse_date(raw)
+        if day is None:
+            raise ValueError
+        value = datetime.combine(day, time.min)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, tz)
+    return value
+
+
+class RowValidator:
+    """Converte e valida uma linha do CSV (dict de colunas) em ManualEntry"""
+
+    def __init__(self, mapping, defaults, entered_by):
+        self.mapping = mapping
+        self.defaults = defaults
+        self.entered_by = entered_by
+        self.platforms = {value for value, _ in ManualEntry.PLATFORM_CHOICES}
+        self.max_name = ManualEntry._meta.get_field('metric_name').max_length
+        self.timezone = timezone.get_current_timezone()
+
+    def _raw(self, row, field):
+        column = self.mapping.get(field)
+        value = row.get(column) if column else None
+        if value is None or not value.strip():
+            value = self.defaults.get(field)
+        return value
+
+    def validate(self, row):
+        """Retorna (ManualEntry, None) ou (None, {campo: [erros]})"""
+        errors = {}
+        values = {field: self._raw(row, field) for field in FIELDS}
+
+        for field in REQUIRED:
+            if values[field] is None or not str(values[field]).strip():
+                errors[field] = ['Este campo é obrigatório.']
+
+        platform = (values['platform'] or '').strip().lower()
+        if 'platform' not in errors and platform not in self.platforms:
+            errors['platform'] = [f'"{platform}" não é uma plataforma válida.']
+
+        metric_name = (values['metric_name'] or '').strip()
+        if 'metric_name' not in errors and len(metric_name) > self.max_name:
+            errors['metric_name'] = [f'Certifique-se de que este campo não tenha mais de {self.max_name} caracteres.']
+
+        metric_value = None
+        if 'metric_value' not in errors:
+            try:
+                metric_value = _integer(values['metric_value'])
+            except ValueError:
+                errors['metric_value'] = ['Um número inteiro válido é necessário.']
+            else:
+                # Fora da faixa do IntegerField, o bloco inteiro falharia no INSERT
+                if not INTEGER_MIN <= metric_value <= INTEGER_MAX:
+                    errors['metric_value'] = ['Valor fora da faixa permitida.']
+
+        collected_at = None
+        if 'collected_at' not in errors:
+            try:
+                collected_at = _datetime(values['collected_at'], self.timezone)
+            except ValueError:
+                errors['collected_at'] = ['Data/hora em formato inválido.']
+
+        if errors:
+            return None, errors
+
+        return ManualEntry(
+            platform=platform,
+            metric_name=metric_name,
+            metric_value=metric_value,
+            notes=values['notes'] or None,
+            entered_by=self.entered_by,
+            collected_at=collected_at,
+        ), None
+
+
+def new_report():
+    """Relatório vazio de uma importação"""
+    return {'rows': 0, 'created': 0, 'skipped': 0, 'errors': [], 'errors_truncated': False}
+
+
+def import_csv(upload, mapping, defaults, entered_by, report=None):
+    """
+    Importa o CSV `upload` (arquivo binário) em blocos.
+
+    `mapping` liga cada campo a uma coluna do CSV (padrão: coluna de mesmo
+    nome) e `defaults` dá o valor dos campos ausentes ou vazios (por exemplo,
+    a plataforma de um export do próprio Facebook). Preenche e retorna o
+    relatório {'rows', 'created', 'skipped', 'errors', 'errors_truncated'};
+    com `report` do chamador (ver `new_report`), ele continua valendo se
+    qualquer exceção interromper a importação depois de blocos já gravados.
+    """
+    if report is None:
+        report = new_report()
+
+    reader = _reader(upload)
+    header = reader.fieldnames or []
+    mapping = {field: mapping.get(field, field) for field in FIELDS}
+
+    missing = [
+        mapping[field]
+        for field in REQUIRED
+        if mapping[field] not in header and defaults.get(field) is None
+    ]
+    if missing:
+        raise InvalidFile(f"Missing columns: {', '.join(missing)}", report)
+
+    validator = RowValidator(mapping, defaults, entered_by)
+    batch_size = settings.MANUAL_IMPORT_BATCH_SIZE
+
+    def flush(objs):
+        with transaction.atomic():
+            report['created'] += bulk_insert(ManualEntry, objs)
+
+    # Blocos de linhas válidas (e não de linhas lidas), para que cada bloco
+    # cheio chegue ao COPY mesmo com linhas ignoradas
+    objs = []
+    rows = iter(reader)
+    # Linha 1 é o cabeçalho
+    line = 1
+    while True:
+        try:
+            row = next(rows, None)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            # Os blocos anteriores já foram gravados
+            flush(objs)
+            raise InvalidFile(f'Invalid CSV after row {line}: {exc}', report)
+        if row is None:
+            break
+
+        line += 1
+        report['rows'] += 1
+        obj, errors = validator.validate(row)
+        if errors:
+            report['skipped'] += 1
+            if len(report['errors']) < settings.MANUAL_IMPORT_MAX_ERRORS:
+                report['errors'].append({'row': line, 'errors': errors})
+            else:
+                report['errors_truncated'] = True
+            continue
+
+        objs.append(obj)
+        if len(objs) >= batch_size:
+            flush(objs)
+            objs = []
+
+    if objs:
+        flush(objs)
+
+    return report
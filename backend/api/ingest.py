@@ -0,0 +1,177 @@
+"""
+Gravação em massa das tabelas de métricas.
+
+Lotes pequenos usam bulk_create; lotes grandes no PostgreSQL usam COPY.
+Depois da gravação os dados derivados (agregados, snapshots, cache) são
+atualizados uma vez para o lote inteiro, já que bulk_create e COPY não
+disparam post_save.
+
+Os coletores gravam com `upsert`, pela chave natural de cada modelo
+(NATURAL_KEY): reexecutar uma coleta não cria linhas novas.
+"""
+import csv
+import io
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from . import cache, live
+from .models import METRIC_SOURCES, IngestBatch
+from .signals import metrics_written
+
+COPY_NULL = '\\N'
+
+
+def _copy_value(field, obj):
+    # pre_save aplica auto_now_add, como no INSERT do ORM
+    value = field.pre_save(obj, add=True)
+    if value is None:
+        return COPY_NULL
+    value = field.get_db_prep_save(value, connection)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _copy(model, objs):
+    """Insere as linhas com COPY ... FROM STDIN (psycopg2)"""
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for obj in objs:
+        writer.writerow([_copy_value(field, obj) for field in fields])
+    buffer.seek(0)
+
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    sql = (
+        f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) "
+        f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+    # wrap_database_errors converte erros do psycopg2 (ex.: IntegrityError) nos do Django
+    with connection.cursor() as cursor, connection.wrap_database_errors:
+        cursor.copy_expert(sql, buffer)
+
+
+def _can_copy():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        return hasattr(cursor.cursor, 'copy_expert')
+
+
+def write_rows(model, objs):
+    """Insere as instâncias (não salvas) sem atualizar os dados derivados"""
+    if len(objs) >= settings.BULK_COPY_THRESHOLD and _can_copy():
+        _copy(model, objs)
+    else:
+        model.objects.bulk_create(objs, batch_size=settings.BULK_INSERT_BATCH_SIZE)
+
+
+def bulk_insert(model, objs):
+    """
+    Insere as instâncias (não salvas) e atualiza os dados derivados.
+
+    Deve ser chamado dentro de uma transação; retorna o número de linhas.
+    """
+    if not objs:
+        return 0
+
+    write_rows(model, objs)
+
+    if model in METRIC_SOURCES.values():
+        metrics_written.send(sender=model, instances=objs, stale=[])
+    else:
+        cache.invalidate('manual')
+        live.publish('manual', objs)
+
+    return len(objs)
+
+
+def ingest(model, objs, key=None):
+    """
+    Grava um lote de forma idempotente.
+
+    Com `key`, um lote já recebido para o mesmo modelo não é gravado de
+    novo. Retorna (linhas gravadas pelo lote, True se o lote é repetido).
+    """
+    with transaction.atomic():
+        if key:
+            batch = reserve_batch(model, key, len(objs))
+            if batch is not None:
+                return batch.row_count, True
+
+        return bulk_insert(model, objs), False
+
+
+def reserve_batch(model, key, row_count=0):
+    """
+    Registra a chave do lote antes da gravação.
+
+    Retorna None se a chave foi reservada agora, ou o IngestBatch já
+    existente. Com duas requisições simultâneas, o INSERT da segunda espera
+    a primeira no índice único e, após o commit dela, recebe o lote
+    existente (e não um IntegrityError).
+    """
+    label = model._meta.label
+    try:
+        with transaction.atomic():
+            IngestBatch.objects.create(key=key, model=label, row_count=row_count)
+    except IntegrityError:
+        return IngestBatch.objects.get(key=key, model=label)
+    return None
+
+
+def settle_batch(model, key, row_count):
+    """
+    Fecha um lote reservado com `reserve_batch` e gravado em várias
+    transações: guarda quantas linhas entraram ou, se nenhuma entrou,
+    libera a chave para que o lote corrigido possa ser reenviado.
+    """
+    batches = IngestBatch.objects.filter(key=key, model=model._meta.label)
+    if row_count:
+        batches.update(row_count=row_count)
+    else:
+        batches.delete()
+
+
+def _natural_key(model, obj):
+    return tuple(getattr(obj, field) for field in model.NATURAL_KEY)
+
+
+def upsert(model, objs):
+    """
+    Grava as linhas pela chave natural do modelo.
+
+    Linhas novas são inseridas, linhas existentes com valores diferentes são
+    atualizadas e linhas idênticas são ignoradas. Deve ser chamado dentro de
+    uma transação; retorna o número de linhas inseridas ou atualizadas.
+    """
+    if not objs:
+        return 0
+
+    fields = model.ROLLUP_FIELDS
+    existing = {
+        _natural_key(model, row): row
+        for row in model.objects.filter(collected_at__in={obj.collected_at for obj in objs})
+    }
+
+    changed = {}
+    for obj in objs:
+        key = _natural_key(model, obj)
+        row = existing.get(key)
+        if row is None or any(getattr(row, field) != getattr(obj, field) for field in fields):
+            changed[key] = obj
+
+    if not changed:
+        return 0
+
+    objs = list(changed.values())
+    model.objects.bulk_create(
+        objs,
+        batch_size=settings.BULK_INSERT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=model.NATURAL_KEY,
+        update_fields=fields,
+    )
+    metrics_written.send(sender=model, instances=objs, stale=[])
+    return len(objs)
@@ -0,0 +1,171 @@
+"""
+Atualizações ao vivo do dashboard via Server-Sent Events.
+
+Cada gravação de métricas (coletores, ingestão em massa, API) ou de entrada
+manual publica, após o commit, um delta pequeno num canal do Redis: só a
+linha mais recente de cada plataforma gravada, no mesmo formato dos
+serializers da API. O endpoint /api/live/ repassa o canal a cada tela
+conectada, que atualiza os cartões sem buscar o resumo inteiro de novo.
+
+Remoções publicam apenas um aviso `invalidate` da fonte; o cliente decide
+se recarrega.
+
+Em produção o endpoint deve rodar no ASGI (uvicorn), onde cada conexão é
+só uma tarefa assíncrona. No runserver/gunicorn (WSGI) funciona, mas cada
+tela conectada ocupa uma thread.
+"""
+import json
+import logging
+from functools import lru_cache
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponseForbidden, StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from .models import AppDownload, ManualEntry, SocialMetric, WebsiteMetric
+from .serializers import (
+    AppDownloadSerializer,
+    ManualEntrySerializer,
+    SocialMetricSerializer,
+    WebsiteMetricSerializer,
+)
+
+logger = logging.getLogger(__name__)
+
+SERIALIZERS = {
+    SocialMetric: SocialMetricSerializer,
+    AppDownload: AppDownloadSerializer,
+    WebsiteMetric: WebsiteMetricSerializer,
+    ManualEntry: ManualEntrySerializer,
+}
+
+
+@lru_cache(maxsize=None)
+def _client():
+    return redis.Redis.from_url(settings.LIVE_REDIS_URL)
+
+
+def _latest_rows(instances):
+    """Linha mais recente de cada plataforma (e métrica, nas entradas manuais)"""
+    latest = {}
+    for instance in instances:
+        key = (getattr(instance, 'platform', ''), getattr(instance, 'metric_name', ''))
+        current = latest.get(key)
+        if current is None or instance.collected_at >= current.collected_at:
+            latest[key] = instance
+    return list(latest.values())
+
+
+def build_events(source, instances, deleted=False):
+    """Eventos publicados para uma gravação da fonte"""
+    if not instances:
+        return []
+    if deleted:
+        return [{'type': 'invalidate', 'source': source}]
+
+    serializer_class = SERIALIZERS[type(instances[0])]
+    return [
+        {'type': 'metric', 'source': source, 'row': serializer_class(instance).data}
+        for instance in _latest_rows(instances)
+    ]
+
+
+def _send(events):
+    try:
+        client = _client()
+        for event in events:
+            client.publish(settings.LIVE_CHANNEL, json.dumps(event, cls=JSONEncoder))
+    except redis.RedisError as exc:
+        # Atualização ao vivo é um extra; não pode derrubar a gravação
+        logger.warning('Falha ao publicar atualização ao vivo: %s', exc)
+
+
+def publish(source, instances, deleted=False):
+    """Publica os deltas da gravação após o commit da transação"""
+    if not settings.LIVE_UPDATES_ENABLED:
+        return
+
+    # Serializa agora: depois do commit as instâncias podem ter mudado
+    events = build_events(source, list(instances), deleted)
+    if events:
+        transaction.on_commit(lambda: _send(events))
+
+
+def _format(data):
+    return f'data: {data}\n\n'.encode()
+
+
+def _authenticate(request):
+    """
+    Valida o token JWT da query string (?token=).
+
+    EventSource não envia cabeçalhos, então o token de acesso vai na URL.
+    """
+    raw_token = request.GET.get('token') or ''
+    authentication = JWTAuthentication()
+    try:
+        user = authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed, TokenError):
+        return None
+    return user if user.is_active else None
+
+
+async def _async_stream():
+    connection = aioredis.Redis.from_url(settings.LIVE_REDIS_URL)
+    pubsub = connection.pubsub()
+    await pubsub.subscribe(settings.LIVE_CHANNEL)
+    try:
+        yield f'retry: {settings.LIVE_RETRY_MS}\n\n'.encode()
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=settings.LIVE_HEARTBEAT_SECONDS,
+            )
+            if message is None:
+                # Comentário SSE: mantém a conexão viva através de proxies
+                yield b': ping\n\n'
+            else:
+                yield _format(message['data'].decode())
+    finally:
+        await pubsub.unsubscribe(settings.LIVE_CHANNEL)
+        await pubsub.aclose()
+        await connection.aclose()
+
+
+def _sync_stream():
+    pubsub = _client().pubsub()
+    pubsub.subscribe(settings.LIVE_CHANNEL)
+    try:
+        yield f'retry: {settings.LIVE_RETRY_MS}\n\n'.encode()
+        while True:
+            message = pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=settings.LIVE_HEARTBEAT_SECONDS,
+            )
+            if message is None:
+                yield b': ping\n\n'
+            else:
+                yield _format(message['data'].decode())
+    finally:
+        pubsub.close()
+
+
+def live_stream(request):
+    """Canal SSE com os deltas das métricas gravadas"""
+    if _authenticate(request) is None:
+        return HttpResponseForbidden()
+
+    # No ASGI o iterador assíncrono é consumido no event loop, sem prender
+    # uma thread por conexão
+    stream = _async_stream() if isinstance(request, ASGIRequest) else _sync_stream()
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Desliga o buffer do nginx para os eventos saírem na hora
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,143 @@
+import json
+import math
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api import cache
+
+PERIODS = ['day', 'week', 'month', 'year']
+
+# Fontes cujas gerações são trocadas para medir com o cache frio
+CACHE_SOURCES = ['social', 'app', 'website', 'manual', 'runs', 'anomalies']
+
+# Endpoints medidos; {period} é substituído por cada período
+ENDPOINTS = [
+    '/api/dashboard/summary/?period={period}',
+    '/api/dashboard/summary/?period={period}&include=totals',
+    '/api/social-metrics/?period={period}',
+    '/api/social-metrics/?period={period}&pagination=cursor',
+    '/api/social-metrics/?period={period}&fields=platform,followers,collected_at',
+    '/api/social-metrics/latest/',
+    '/api/social-metrics/comparison/?platform=twitter&period={period}',
+    '/api/social-metrics/trends/',
+    '/api/social-metrics/growth/?period={period}',
+    '/api/social-metrics/forecast/?target=2000000',
+    '/api/social-metrics/series/?period={period}&bucket=day',
+    '/api/app-downloads/?period={period}',
+    '/api/app-downloads/total/',
+    '/api/app-downloads/growth/?period={period}',
+    '/api/app-downloads/forecast/',
+    '/api/app-downloads/series/?period={period}&bucket=day',
+    '/api/website-metrics/?period={period}',
+    '/api/website-metrics/summary/?period={period}',
+    '/api/website-metrics/series/?period={period}&bucket=day',
+    '/api/manual-entries/',
+]
+
+
+def percentile(values, percent):
+    """Percentil pelo método nearest-rank"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Command(BaseCommand):
+    help = 'Mede latência (p50/p99), número de consultas e tamanho da resposta de cada endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Requisições medidas por endpoint')
+        parser.add_argument('--warmup', type=int, default=2, help='Requisições descartadas antes de medir')
+        parser.add_argument(
+            '--period',
+            choices=PERIODS,
+            action='append',
+            help='Período a medir (padrão: todos)',
+        )
+        parser.add_argument('--filter', default='', help='Mede apenas endpoints que contêm o texto')
+        parser.add_argument(
+            '--warm',
+            action='store_true',
+            help='Mantém o cache de respostas entre requisições (por padrão ele é invalidado antes de cada uma)',
+        )
+        parser.add_argument('--output', help='Grava os resultados em JSON')
+        parser.add_argument('--compare', help='JSON de uma execução anterior para comparar')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat deve ser positivo')
+
+        baseline = {}
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = {
+                    result['url']: result for result in json.load(baseline_file)['results']
+                }
+
+        client = APIClient()
+        client.force_authenticate(User(username='benchmark'))
+
+        results = []
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for url in self._urls(options['period'] or PERIODS, options['filter']):
+                results.append(self._measure(client, url, options))
+                self._print(results[-1], baseline.get(url))
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump({'vendor': connection.vendor, 'results': results}, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['output']}"))
+
+    def _urls(self, periods, text):
+        for endpoint in ENDPOINTS:
+            urls = [endpoint.format(period=period) for period in periods] if '{period}' in endpoint else [endpoint]
+            for url in urls:
+                if text in url:
+                    yield url
+
+    def _invalidate_cache(self):
+        # Troca as gerações (como uma gravação) em vez de cache.clear(), que
+        # apagaria todo o banco do Redis: locks, aderência à réplica etc.
+        for source in CACHE_SOURCES:
+            cache.invalidate(source)
+
+    def _measure(self, client, url, options):
+        for _ in range(options['warmup']):
+            if not options['warm']:
+                self._invalidate_cache()
+            client.get(url)
+
+        timings = []
+        for _ in range(options['repeat']):
+            if not options['warm']:
+                self._invalidate_cache()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+
+        if response.status_code != 200:
+            raise CommandError(f'{url} respondeu {response.status_code}: {response.content[:200]!r}')
+
+        return {
+            'url': url,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'queries': len(queries),
+            'bytes': len(response.content),
+        }
+
+    def _print(self, result, previous):
+        line = (
+            f"{result['url']:<70} p50 {result['p50_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms  "
+            f"{result['queries']:>4} queries  {result['bytes']:>9} bytes"
+        )
+        if previous:
+            change = (result['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100 if previous['p50_ms'] else 0
+            line += f"  (p50 {change:+.1f}%, queries {result['queries'] - previous['queries']:+d})"
+        self.stdout.write(line)
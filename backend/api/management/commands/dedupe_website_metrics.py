@@ -0,0 +1,60 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from api import anomalies, cache, partitions, rollups, snapshots
+from api.models import WebsiteMetric
+
+
+def collapse_days(model):
+    """
+    Reduz a tabela a uma linha por dia local: mantém a mais recente (maior
+    id) e a data na meia-noite do dia, como grava o coletor do Analytics.
+
+    Retorna (linhas apagadas, linhas redatadas).
+    """
+    tz = timezone.get_default_timezone()
+    days = (
+        model.objects.order_by()
+        .annotate(day=TruncDate('collected_at', tzinfo=tz))
+        .values('day')
+        .annotate(keep=Max('id'))
+        .order_by('day')
+    )
+
+    deleted = restamped = 0
+    for group in days:
+        start = timezone.make_aware(datetime.combine(group['day'], time.min), tz)
+        end = timezone.make_aware(datetime.combine(group['day'] + timedelta(days=1), time.min), tz)
+        # Sem sinais por linha: os dados derivados são reconstruídos no fim
+        deleted += partitions.delete_rows(
+            model.objects.order_by()
+            .filter(collected_at__gte=start, collected_at__lt=end)
+            .exclude(id=group['keep'])
+        )
+        restamped += model.objects.filter(id=group['keep']).exclude(collected_at=start).update(collected_at=start)
+
+    return deleted, restamped
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove as linhas duplicadas de WebsiteMetric gravadas pelo coletor antigo '
+        '(uma por coleta, datadas com o horário da coleta) e reconstrói os dados derivados'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            deleted, restamped = collapse_days(WebsiteMetric)
+        self.stdout.write(f'WebsiteMetric: {deleted} linhas apagadas, {restamped} redatadas para a meia-noite')
+
+        rollups.rebuild(WebsiteMetric)
+        snapshots.rebuild(WebsiteMetric)
+        anomalies.rebuild(WebsiteMetric)
+        cache.invalidate('website')
+
+        self.stdout.write(self.style.SUCCESS('Agregados, snapshots e linhas de base de anomalias reconstruídos'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api import anomalies
+from api.models import METRIC_SOURCES
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói as linhas de base (MetricBaseline) e as anomalias (MetricAnomaly) a partir das tabelas de métricas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            choices=list(METRIC_SOURCES),
+            action='append',
+            help='Fonte a reconstruir (padrão: todas)',
+        )
+
+    def handle(self, *args, **options):
+        for source in options['source'] or METRIC_SOURCES:
+            total = anomalies.rebuild(METRIC_SOURCES[source])
+            self.stdout.write(self.style.SUCCESS(f'{source}: {total} anomalias registradas'))
@@ -0,0 +1,216 @@
+import math
+import random
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api import anomalies, cache, ingest, partitions, rollups, snapshots
+from api.models import METRIC_SOURCES, AppDownload, ManualEntry, SocialMetric, WebsiteMetric
+
+# Seguidores iniciais e crescimento médio por dia de cada rede
+SOCIAL_PROFILES = {
+    'twitter': (850000, 120),
+    'facebook': (420000, 60),
+    'instagram': (310000, 150),
+    'youtube': (45000, 25),
+    'threads': (60000, 90),
+}
+
+# Downloads acumulados iniciais e downloads médios por dia de cada loja
+APP_PROFILES = {
+    'android': (380000, 350),
+    'ios': (150000, 140),
+}
+
+MANUAL_METRICS = ['followers', 'reach', 'impressions']
+
+
+def _diurnal(moment):
+    """Fator de atividade pela hora do dia (pico no fim da tarde) e dia da semana"""
+    local = timezone.localtime(moment)
+    hour = local.hour + local.minute / 60
+    daily = 0.55 + 0.45 * math.sin((hour - 11) / 24 * 2 * math.pi)
+    weekly = 0.8 if local.weekday() >= 5 else 1.0
+    return daily * weekly
+
+
+class Command(BaseCommand):
+    help = 'Gera métricas sintéticas realistas para testes de carga e benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=730, help='Dias de histórico (padrão: 730)')
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=60,
+            help='Minutos entre coletas de redes sociais (padrão: 60; website e apps têm uma linha por dia)',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador aleatório')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Linhas por transação')
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Apaga as métricas e entradas manuais existentes antes de gerar',
+        )
+
+    def handle(self, *args, **options):
+        if options['interval'] < 1 or options['days'] < 1:
+            raise CommandError('--days e --interval devem ser positivos')
+
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.end = rollups.bucket_start(timezone.now(), 'hour')
+        self.start = self.end - timedelta(days=options['days'])
+        step = timedelta(minutes=options['interval'])
+
+        models = list(METRIC_SOURCES.values()) + [ManualEntry]
+        if options['clear']:
+            for model in models:
+                partitions.delete_rows(model.objects.order_by())
+        elif any(model.objects.filter(collected_at__gte=self.start).exists() for model in models):
+            raise CommandError('Já existem métricas no intervalo; use --clear para substituí-las')
+
+        for model in METRIC_SOURCES.values():
+            partitions.ensure_partitions(model, since=self.start)
+
+        self._write(SocialMetric, self._social_rows(step))
+        self._write(WebsiteMetric, self._website_rows())
+        self._write(AppDownload, self._app_rows())
+        self._write(ManualEntry, self._manual_rows())
+
+        for source, model in METRIC_SOURCES.items():
+            rollups.rebuild(model)
+            if rollups.has_platform(model):
+                snapshots.rebuild(model)
+            anomalies.rebuild(model)
+            cache.invalidate(source)
+        cache.invalidate('manual')
+
+        self.stdout.write(self.style.SUCCESS('Agregados, snapshots e linhas de base de anomalias reconstruídos'))
+
+    def _write(self, model, rows):
+        total = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                total += self._flush(model, batch)
+                batch = []
+        total += self._flush(model, batch)
+        self.stdout.write(f'{model.__name__}: {total} linhas')
+
+    def _flush(self, model, batch):
+        if batch:
+            with transaction.atomic():
+                ingest.write_rows(model, batch)
+        return len(batch)
+
+    def _moments(self, step):
+        moment = self.start
+        while moment <= self.end:
+            yield moment
+            moment += step
+
+    def _social_rows(self, step):
+        days_per_step = step.total_seconds() / 86400
+        state = {
+            platform: {'followers': followers, 'posts': self.random.randint(2000, 30000)}
+            for platform, (followers, _) in SOCIAL_PROFILES.items()
+        }
+
+        for moment in self._moments(step):
+            activity = _diurnal(moment)
+            for platform, (_, growth) in SOCIAL_PROFILES.items():
+                current = state[platform]
+                current['followers'] = max(
+                    0,
+                    current['followers'] + round(self.random.gauss(growth, growth * 0.8) * days_per_step),
+                )
+                if self.random.random() < 0.2 * activity:
+                    current['posts'] += 1
+
+                views = int(current['followers'] * 0.02 * activity * self.random.uniform(0.6, 1.4) * days_per_step * 24)
+                likes = int(views * self.random.uniform(0.01, 0.05))
+                comments = int(likes * self.random.uniform(0.02, 0.1))
+                shares = int(likes * self.random.uniform(0.05, 0.2))
+
+                yield SocialMetric(
+                    platform=platform,
+                    followers=current['followers'],
+                    following=self.random.randint(300, 320),
+                    posts_count=current['posts'],
+                    engagement_rate=round((likes + comments + shares) / max(views, 1) * 100, 2),
+                    likes=likes,
+                    comments=comments,
+                    shares=shares,
+                    views=views,
+                    collected_at=moment,
+                )
+
+    def _website_days(self):
+        # Como o coletor do Analytics: uma linha por dia, na meia-noite local
+        day = timezone.localdate(self.start) + timedelta(days=1)
+        while True:
+            moment = timezone.make_aware(datetime.combine(day, time.min))
+            if moment > self.end:
+                return
+            yield moment
+            day += timedelta(days=1)
+
+    def _website_rows(self):
+        for moment in self._website_days():
+            weekly = 0.8 if moment.weekday() >= 5 else 1.0
+            page_views = int(1800 * 24 * 0.55 * weekly * self.random.uniform(0.7, 1.3))
+            visitors = int(page_views * self.random.uniform(0.45, 0.6))
+            sessions = int(visitors * self.random.uniform(1.1, 1.3))
+            organic = int(sessions * self.random.uniform(0.4, 0.55))
+            direct = int(sessions * self.random.uniform(0.2, 0.3))
+            social = int(sessions * self.random.uniform(0.1, 0.2))
+
+            yield WebsiteMetric(
+                page_views=page_views,
+                unique_visitors=visitors,
+                sessions=sessions,
+                bounce_rate=round(self.random.uniform(35, 60), 2),
+                avg_session_duration=self.random.randint(60, 240),
+                organic_traffic=organic,
+                direct_traffic=direct,
+                referral_traffic=max(sessions - organic - direct - social, 0),
+                social_traffic=social,
+                collected_at=moment,
+            )
+
+    def _app_rows(self):
+        for platform, (total, daily) in APP_PROFILES.items():
+            history = []
+            for moment in self._moments(timedelta(days=1)):
+                downloads = max(0, int(self.random.gauss(daily, daily * 0.3)))
+                total += downloads
+                history.append(downloads)
+
+                yield AppDownload(
+                    platform=platform,
+                    total_downloads=total,
+                    daily_downloads=downloads,
+                    weekly_downloads=sum(history[-7:]),
+                    monthly_downloads=sum(history[-30:]),
+                    active_users=int(total * self.random.uniform(0.08, 0.12)),
+                    rating=round(self.random.uniform(4.1, 4.7), 1),
+                    reviews_count=int(total * 0.004),
+                    collected_at=moment,
+                )
+
+    def _manual_rows(self):
+        platforms = [platform for platform, _ in ManualEntry.PLATFORM_CHOICES if platform != 'other']
+        for moment in self._moments(timedelta(days=7)):
+            for platform in platforms:
+                for metric_name in MANUAL_METRICS:
+                    yield ManualEntry(
+                        platform=platform,
+                        metric_name=metric_name,
+                        metric_value=self.random.randint(1000, 500000),
+                        entered_by='seed_metrics',
+                        collected_at=moment,
+                    )
@@ -0,0 +1,169 @@
+"""
+Métricas no formato do Prometheus.
+
+Cada requisição registra latência, número de consultas, tempo no banco e
+bytes da resposta por view e action do DRF (incluindo as actions
+customizadas como `summary`, `latest` e `comparison`); cada execução de
+coletor registra duração, tempo nas APIs externas, linhas gravadas e
+tentativas repetidas por fonte. Registrar uma
+observação é só um incremento em memória; o texto do Prometheus é montado
+apenas quando /metrics é consultado.
+
+Com vários processos (gunicorn, workers do Celery), defina
+PROMETHEUS_MULTIPROC_DIR para que os valores de todos os processos sejam
+somados na coleta.
+"""
+import os
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COLLECTOR_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+ROWS_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+REQUEST_LABELS = ['view', 'action', 'method']
+
+request_duration = Histogram(
+    'dashboard_http_request_duration_seconds',
+    'Latência das requisições por view/action',
+    REQUEST_LABELS,
+    buckets=LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    'dashboard_http_db_queries',
+    'Consultas SQL por requisição',
+    REQUEST_LABELS,
+    buckets=QUERY_BUCKETS,
+)
+request_db_duration = Histogram(
+    'dashboard_http_db_duration_seconds',
+    'Tempo gasto no banco por requisição',
+    REQUEST_LABELS,
+    buckets=LATENCY_BUCKETS,
+)
+response_bytes = Histogram(
+    'dashboard_http_response_bytes',
+    'Tamanho do corpo das respostas',
+    REQUEST_LABELS,
+    buckets=BYTES_BUCKETS,
+)
+requests_total = Counter(
+    'dashboard_http_requests',
+    'Requisições por view/action e status',
+    REQUEST_LABELS + ['status'],
+)
+
+collector_duration = Histogram(
+    'dashboard_collector_duration_seconds',
+    'Duração das execuções dos coletores',
+    ['source', 'status'],
+    buckets=COLLECTOR_BUCKETS,
+)
+collector_external_duration = Histogram(
+    'dashboard_collector_external_duration_seconds',
+    'Tempo gasto nas APIs externas por execução',
+    ['source'],
+    buckets=COLLECTOR_BUCKETS,
+)
+collector_rows = Histogram(
+    'dashboard_collector_rows_written',
+    'Linhas gravadas por execução',
+    ['source'],
+    buckets=ROWS_BUCKETS,
+)
+collector_retries = Counter(
+    'dashboard_collector_retries',
+    'Chamadas externas repetidas pelos coletores',
+    ['source'],
+)
+
+
+class QueryStats:
+    """Wrapper de execução do banco (connection.execute_wrapper) que conta e cronometra as consultas"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def view_labels(view_func, method):
+    """
+    Retorna (view, action) da função resolvida pela URL.
+
+    Para viewsets do DRF, action é o nome do método (list, retrieve,
+    summary...); para outras views, fica vazia.
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'unknown'), ''
+
+    actions = getattr(view_func, 'actions', None) or {}
+    return cls.__name__, actions.get(method.lower(), '')
+
+
+@lru_cache(maxsize=None)
+def _request_series(view, action, method):
+    # Séries já resolvidas por rótulo; evita o lookup de labels() a cada requisição
+    return (
+        request_duration.labels(view, action, method),
+        request_queries.labels(view, action, method),
+        request_db_duration.labels(view, action, method),
+        response_bytes.labels(view, action, method),
+    )
+
+
+def observe_request(view, action, method, status, duration, queries, response_size=None):
+    duration_series, queries_series, db_series, bytes_series = _request_series(view, action, method)
+    duration_series.observe(duration)
+    queries_series.observe(queries.count)
+    db_series.observe(queries.duration)
+    if response_size is not None:
+        bytes_series.observe(response_size)
+    requests_total.labels(view, action, method, str(status)).inc()
+
+
+def observe_collector_run(run):
+    collector_duration.labels(run.source, run.status).observe(run.duration_seconds)
+    collector_external_duration.labels(run.source).observe(run.external_seconds)
+    collector_rows.labels(run.source).observe(run.rows_written)
+    if run.retries:
+        collector_retries.labels(run.source).inc(run.retries)
+
+
+def _registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    """Expõe as métricas no formato texto do Prometheus"""
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,78 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, routers
+
+
+class MetricsMiddleware:
+    """
+    Registra latência, consultas SQL, tempo no banco e tamanho da resposta
+    de cada requisição, rotulados pela view e action do DRF.
+
+    Deve ser o primeiro middleware para que a latência inclua os demais.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = metrics.QueryStats()
+        started = time.perf_counter()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+
+        view, action = getattr(request, '_metrics_labels', ('unmatched', ''))
+        if view is not None:
+            metrics.observe_request(
+                view,
+                action,
+                request.method,
+                response.status_code,
+                time.perf_counter() - started,
+                queries,
+                # Respostas em streaming não têm tamanho conhecido aqui
+                None if response.streaming else len(response.content),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if view_func is metrics.metrics_view:
+            # A própria coleta não entra nas métricas
+            request._metrics_labels = (None, None)
+        else:
+            request._metrics_labels = metrics.view_labels(view_func, request.method)
+
+
+class ReplicaMiddleware:
+    """
+    Leituras de requisições GET/HEAD na réplica (ver api.routers); grava a
+    aderência ao primário do cliente após POST/PUT/PATCH/DELETE.
+
+    Sem o alias `replica` em DATABASES, o middleware é desativado.
+    """
+
+    def __init__(self, get_response):
+        if not routers.replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in routers.SAFE_METHODS:
+            response = self.get_response(request)
+            routers.pin_client(request)
+            return response
+
+        token = routers.use_replica(request)
+        try:
+            return self.get_response(request)
+        finally:
+            routers.release(token)
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('social', 'Redes sociais'), ('app', 'Aplicativos'), ('website', 'Website')], max_length=20)),
+                ('platform', models.CharField(blank=True, default='', max_length=20)),
+                ('field', models.CharField(max_length=50)),
+                ('granularity', models.CharField(choices=[('hour', 'Hora'), ('day', 'Dia')], max_length=5)),
+                ('bucket', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.FloatField(default=0.0)),
+                ('minimum', models.FloatField(blank=True, null=True)),
+                ('maximum', models.FloatField(blank=True, null=True)),
+                ('last_value', models.FloatField(blank=True, null=True)),
+                ('last_collected_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-bucket'],
+                'indexes': [models.Index(fields=['source', 'field', 'granularity', 'bucket'], name='api_metricr_source_7159be_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='metricrollup',
+            constraint=models.UniqueConstraint(fields=('source', 'platform', 'field', 'granularity', 'bucket'), name='unique_metric_rollup_bucket'),
+        ),
+    ]
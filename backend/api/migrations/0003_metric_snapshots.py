@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+def build_snapshots(apps, schema_editor):
+    MetricSnapshot = apps.get_model('api', 'MetricSnapshot')
+    sources = {
+        'social': apps.get_model('api', 'SocialMetric'),
+        'app': apps.get_model('api', 'AppDownload'),
+    }
+
+    for source, model in sources.items():
+        platforms = model.objects.order_by().values_list('platform', flat=True).distinct()
+        for platform in platforms:
+            row = model.objects.filter(platform=platform).order_by('-collected_at', '-id').first()
+            MetricSnapshot.objects.create(
+                source=source,
+                platform=platform,
+                row_id=row.id,
+                collected_at=row.collected_at,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_metric_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('social', 'Redes sociais'), ('app', 'Aplicativos'), ('website', 'Website')], max_length=20)),
+                ('platform', models.CharField(blank=True, default='', max_length=20)),
+                ('row_id', models.BigIntegerField()),
+                ('collected_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['source', 'platform'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='metricsnapshot',
+            constraint=models.UniqueConstraint(fields=('source', 'platform'), name='unique_metric_snapshot_platform'),
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:24
+
+from datetime import datetime, time, timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def collapse_website_days(WebsiteMetric):
+    # O coletor antigo regravava os últimos 7 dias a cada execução, datando as
+    # linhas com o horário da coleta: mantém a mais recente de cada dia local,
+    # na meia-noite do dia (como o coletor novo grava)
+    tz = timezone.get_default_timezone()
+    days = (
+        WebsiteMetric.objects.order_by()
+        .annotate(day=TruncDate('collected_at', tzinfo=tz))
+        .values('day')
+        .annotate(keep=Max('id'))
+    )
+    for group in days:
+        start = timezone.make_aware(datetime.combine(group['day'], time.min), tz)
+        end = timezone.make_aware(datetime.combine(group['day'] + timedelta(days=1), time.min), tz)
+        WebsiteMetric.objects.filter(collected_at__gte=start, collected_at__lt=end).exclude(id=group['keep']).delete()
+        WebsiteMetric.objects.filter(id=group['keep']).update(collected_at=start)
+
+
+def remove_duplicates(apps, schema_editor):
+    collapse_website_days(apps.get_model('api', 'WebsiteMetric'))
+
+    # Mantém apenas a linha mais recente (maior id) de cada chave natural
+    natural_keys = {
+        'SocialMetric': ['platform', 'collected_at'],
+        'AppDownload': ['platform', 'collected_at'],
+    }
+
+    for model_name, key in natural_keys.items():
+        model = apps.get_model('api', model_name)
+        groups = (
+            model.objects.order_by()
+            .values(*key)
+            .annotate(keep=Max('id'), rows=Count('id'))
+            .filter(rows__gt=1)
+        )
+        for group in groups:
+            keep = group.pop('keep')
+            group.pop('rows')
+            model.objects.filter(**group).exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_ingest_batches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectorWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=20, unique=True)),
+                ('value', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['source'],
+            },
+        ),
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appdownload',
+            constraint=models.UniqueConstraint(fields=('platform', 'collected_at'), name='unique_app_download_platform_collected_at'),
+        ),
+        migrations.AddConstraint(
+            model_name='socialmetric',
+            constraint=models.UniqueConstraint(fields=('platform', 'collected_at'), name='unique_social_metric_platform_collected_at'),
+        ),
+        migrations.AddConstraint(
+            model_name='websitemetric',
+            constraint=models.UniqueConstraint(fields=('collected_at',), name='unique_website_metric_collected_at'),
+        ),
+    ]
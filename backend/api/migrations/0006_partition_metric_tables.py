@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+from api.partitions import add_months, create_partition, default_partition_name, month_start
+
+
+def partition_tables(apps, schema_editor):
+    """
+    Recria as tabelas de séries temporais como tabelas particionadas por mês
+    em collected_at (somente PostgreSQL).
+
+    A chave primária passa a ser (id, collected_at), já que toda constraint
+    única de uma tabela particionada precisa incluir a chave de partição; o
+    id continua único (sequência própria) e é a chave usada pelo Django.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    quote = schema_editor.quote_name
+    for model_name in ('SocialMetric', 'AppDownload', 'WebsiteMetric'):
+        model = apps.get_model('api', model_name)
+        table = model._meta.db_table
+        old = f'{table}_unpartitioned'
+        sequence = f'{table}_id_seq'
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}')
+            cursor.execute(
+                f'CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS) '
+                f'PARTITION BY RANGE (collected_at)'
+            )
+            cursor.execute(
+                f'CREATE TABLE {quote(default_partition_name(table))} PARTITION OF {quote(table)} DEFAULT'
+            )
+
+            # Um mês por partição, do dado mais antigo até alguns meses à frente
+            cursor.execute(f'SELECT MIN(collected_at), MAX(collected_at), MAX(id) FROM {quote(old)}')
+            first, last, max_id = cursor.fetchone()
+            now = timezone.now()
+            start = month_start(min(first or now, now))
+            stop = add_months(month_start(max(last or now, now)), settings.METRIC_PARTITION_MONTHS_AHEAD)
+            while start <= stop:
+                create_partition(cursor, table, start)
+                start = add_months(start, 1)
+
+            cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(old)}')
+            cursor.execute(f'DROP TABLE {quote(old)}')
+
+            cursor.execute(f'CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(table)}.id')
+            cursor.execute('SELECT setval(%s, %s, false)', [sequence, (max_id or 0) + 1])
+            cursor.execute(f"ALTER TABLE {quote(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD PRIMARY KEY (id, collected_at)')
+
+        # Índices e constraints no pai valem para todas as partições
+        for index in model._meta.indexes:
+            schema_editor.add_index(model, index)
+        for constraint in model._meta.constraints:
+            schema_editor.add_constraint(model, constraint)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_natural_keys_and_watermarks'),
+    ]
+
+    operations = [
+        # Sem volta automática: as tabelas continuam particionadas
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:37
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_partition_metric_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectorRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('twitter', 'Twitter/X'), ('youtube', 'YouTube'), ('app_store', 'App Store'), ('google_play', 'Google Play'), ('analytics', 'Google Analytics')], max_length=20)),
+                ('status', models.CharField(choices=[('running', 'Em execução'), ('success', 'Sucesso'), ('empty', 'Sem dados'), ('error', 'Erro')], default='running', max_length=10)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+                ('external_calls', models.IntegerField(default=0)),
+                ('external_seconds', models.FloatField(default=0.0)),
+                ('retries', models.IntegerField(default=0)),
+                ('rows_written', models.IntegerField(default=0)),
+                ('error_class', models.CharField(blank=True, default='', max_length=100)),
+                ('error_message', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['source', 'started_at'], name='api_collect_source_e3f9be_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_collector_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('social', 'Redes sociais'), ('app', 'Aplicativos'), ('website', 'Website')], max_length=20)),
+                ('platform', models.CharField(blank=True, default='', max_length=20)),
+                ('field', models.CharField(max_length=50)),
+                ('collected_at', models.DateTimeField()),
+                ('value', models.FloatField()),
+                ('expected', models.FloatField()),
+                ('score', models.FloatField()),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Metric anomalies',
+                'ordering': ['-collected_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MetricBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('social', 'Redes sociais'), ('app', 'Aplicativos'), ('website', 'Website')], max_length=20)),
+                ('platform', models.CharField(blank=True, default='', max_length=20)),
+                ('field', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('mean', models.FloatField(default=0.0)),
+                ('variance', models.FloatField(default=0.0)),
+                ('last_value', models.FloatField(blank=True, null=True)),
+                ('last_collected_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['source', 'platform', 'field'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='metricbaseline',
+            constraint=models.UniqueConstraint(fields=('source', 'platform', 'field'), name='unique_metric_baseline_field'),
+        ),
+        migrations.AddIndex(
+            model_name='metricanomaly',
+            index=models.Index(fields=['source', 'collected_at'], name='api_metrica_source_8c05ad_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='metricanomaly',
+            constraint=models.UniqueConstraint(fields=('source', 'platform', 'field', 'collected_at'), name='unique_metric_anomaly_point'),
+        ),
+    ]
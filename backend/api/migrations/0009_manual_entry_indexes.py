@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_anomaly_detection'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='manualentry',
+            index=models.Index(fields=['platform', 'metric_name', '-collected_at'], name='api_manuale_platfor_52991e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='manualentry',
+            index=models.Index(fields=['platform', 'collected_at'], name='api_manuale_platfor_08f986_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_manual_entry_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingestbatch',
+            name='key',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='ingestbatch',
+            constraint=models.UniqueConstraint(fields=('model', 'key'), name='unique_ingest_batch_model_key'),
+        ),
+    ]
@@ -13,6 +13,19 @@ class SocialMetric(models.Model):
         ('threads', 'Threads'),
     ]
     
+    # Campos numéricos consolidados em MetricRollup
+    ROLLUP_FIELDS = [
+        'followers', 'following', 'posts_count', 'engagement_rate',
+        'likes', 'comments', 'shares', 'views',
+    ]
+    
+    # Campos que medem um nível acumulado; anomalias são procuradas na
+    # variação entre coletas, e não no valor
+    LEVEL_FIELDS = ['followers', 'following', 'posts_count']
+    
+    # Chave natural usada nas gravações idempotentes (upsert) dos coletores
+    NATURAL_KEY = ['platform', 'collected_at']
+    
     platform = models.CharField(max_length=20, choices=PLATFORM_CHOICES)
     followers = models.IntegerField(default=0)
     following = models.IntegerField(default=0, null=True, blank=True)
@@ -31,6 +44,12 @@ class SocialMetric(models.Model):
     
     class Meta:
         ordering = ['-collected_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['platform', 'collected_at'],
+                name='unique_social_metric_platform_collected_at',
+            ),
+        ]
         indexes = [
             models.Index(fields=['platform', 'collected_at']),
         ]
@@ -47,6 +66,18 @@ class AppDownload(models.Model):
         ('ios', 'App Store'),
     ]
     
+    ROLLUP_FIELDS = [
+        'total_downloads', 'daily_downloads', 'weekly_downloads',
+        'monthly_downloads', 'active_users', 'rating', 'reviews_count',
+    ]
+    
+    LEVEL_FIELDS = [
+        'total_downloads', 'weekly_downloads', 'monthly_downloads',
+        'active_users', 'rating', 'reviews_count',
+    ]
+    
+    NATURAL_KEY = ['platform', 'collected_at']
+    
     platform = models.CharField(max_length=10, choices=PLATFORM_CHOICES)
     total_downloads = models.IntegerField(default=0)
     daily_downloads = models.IntegerField(default=0, null=True, blank=True)
@@ -64,6 +95,12 @@ class AppDownload(models.Model):
     
     class Meta:
         ordering = ['-collected_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['platform', 'collected_at'],
+                name='unique_app_download_platform_collected_at',
+            ),
+        ]
         indexes = [
             models.Index(fields=['platform', 'collected_at']),
         ]
@@ -75,6 +112,16 @@ class AppDownload(models.Model):
 class WebsiteMetric(models.Model):
     """Métricas de acesso ao site"""
     
+    ROLLUP_FIELDS = [
+        'page_views', 'unique_visitors', 'sessions', 'bounce_rate',
+        'avg_session_duration', 'organic_traffic', 'direct_traffic',
+        'referral_traffic', 'social_traffic',
+    ]
+    
+    LEVEL_FIELDS = []
+    
+    NATURAL_KEY = ['collected_at']
+    
     page_views = models.IntegerField(default=0)
     unique_visitors = models.IntegerField(default=0)
     sessions = models.IntegerField(default=0)
@@ -93,6 +140,12 @@ class WebsiteMetric(models.Model):
     
     class Meta:
         ordering = ['-collected_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['collected_at'],
+                name='unique_website_metric_collected_at',
+            ),
+        ]
         indexes = [
             models.Index(fields=['collected_at']),
         ]
@@ -124,6 +177,233 @@ class ManualEntry(models.Model):
     class Meta:
         ordering = ['-collected_at']
         verbose_name_plural = "Manual entries"
+        indexes = [
+            # Série de uma métrica e valor mais recente de cada (plataforma, métrica)
+            models.Index(fields=['platform', 'metric_name', '-collected_at']),
+            # Listagem filtrada por plataforma, da mais recente para a mais antiga
+            models.Index(fields=['platform', 'collected_at']),
+        ]
     
     def __str__(self):
         return f"{self.platform} - {self.metric_name}: {self.metric_value}"
+
+
+# Tabelas de séries temporais cobertas pelos agregados
+METRIC_SOURCES = {
+    'social': SocialMetric,
+    'app': AppDownload,
+    'website': WebsiteMetric,
+}
+
+
+class MetricRollup(models.Model):
+    """Agregados horários e diários por plataforma das métricas coletadas"""
+    
+    SOURCE_CHOICES = [
+        ('social', 'Redes sociais'),
+        ('app', 'Aplicativos'),
+        ('website', 'Website'),
+    ]
+    
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hora'),
+        ('day', 'Dia'),
+    ]
+    
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    platform = models.CharField(max_length=20, blank=True, default='')
+    field = models.CharField(max_length=50)
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    
+    # Estatísticas do bucket (apenas valores não nulos)
+    count = models.IntegerField(default=0)
+    total = models.FloatField(default=0.0)
+    minimum = models.FloatField(null=True, blank=True)
+    maximum = models.FloatField(null=True, blank=True)
+    last_value = models.FloatField(null=True, blank=True)
+    last_collected_at = models.DateTimeField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-bucket']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'platform', 'field', 'granularity', 'bucket'],
+                name='unique_metric_rollup_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['source', 'field', 'granularity', 'bucket']),
+        ]
+    
+    def __str__(self):
+        return f"{self.source}/{self.platform or '-'} {self.field} ({self.granularity}) - {self.bucket.strftime('%d/%m/%Y %H:%M')}"
+
+
+class MetricSnapshot(models.Model):
+    """Linha mais recente de cada (fonte, plataforma), mantida a cada gravação"""
+    
+    source = models.CharField(max_length=20, choices=MetricRollup.SOURCE_CHOICES)
+    platform = models.CharField(max_length=20, blank=True, default='')
+    row_id = models.BigIntegerField()
+    collected_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['source', 'platform']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'platform'],
+                name='unique_metric_snapshot_platform',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.source}/{self.platform or '-'} - #{self.row_id} - {self.collected_at.strftime('%d/%m/%Y %H:%M')}"
+
+
+class MetricBaseline(models.Model):
+    """
+    Estado incremental da detecção de anomalias de cada (fonte, plataforma,
+    campo): média e variância com pesos exponenciais (EWMA) dos valores, ou
+    das variações entre coletas nos campos de nível.
+    """
+    
+    source = models.CharField(max_length=20, choices=MetricRollup.SOURCE_CHOICES)
+    platform = models.CharField(max_length=20, blank=True, default='')
+    field = models.CharField(max_length=50)
+    
+    count = models.IntegerField(default=0)
+    mean = models.FloatField(default=0.0)
+    variance = models.FloatField(default=0.0)
+    # Último valor bruto (base da variação nos campos de nível)
+    last_value = models.FloatField(null=True, blank=True)
+    last_collected_at = models.DateTimeField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['source', 'platform', 'field']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'platform', 'field'],
+                name='unique_metric_baseline_field',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.source}/{self.platform or '-'} {self.field} ({self.count} amostras)"
+
+
+class MetricAnomaly(models.Model):
+    """Valor coletado fora da faixa esperada pela linha de base"""
+    
+    source = models.CharField(max_length=20, choices=MetricRollup.SOURCE_CHOICES)
+    platform = models.CharField(max_length=20, blank=True, default='')
+    field = models.CharField(max_length=50)
+    collected_at = models.DateTimeField()
+    
+    value = models.FloatField()
+    expected = models.FloatField()
+    # Desvio em relação ao esperado, em desvios padrão
+    score = models.FloatField()
+    
+    detected_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-collected_at']
+        verbose_name_plural = "Metric anomalies"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'platform', 'field', 'collected_at'],
+                name='unique_metric_anomaly_point',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['source', 'collected_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.source}/{self.platform or '-'} {self.field} = {self.value} ({self.score:+.1f}σ) - {self.collected_at.strftime('%d/%m/%Y %H:%M')}"
+
+
+class IngestBatch(models.Model):
+    """Lotes recebidos pelos endpoints de ingestão em massa (idempotência)"""
+    
+    # A mesma chave em modelos diferentes são lotes diferentes
+    key = models.CharField(max_length=100)
+    model = models.CharField(max_length=50)
+    row_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = "Ingest batches"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model', 'key'],
+                name='unique_ingest_batch_model_key',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.model} - {self.key} ({self.row_count} linhas)"
+
+
+class CollectorWatermark(models.Model):
+    """Último instante coletado por fonte externa (coleta incremental)"""
+    
+    source = models.CharField(max_length=20, unique=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['source']
+    
+    def __str__(self):
+        return f"{self.source} - {self.value.strftime('%d/%m/%Y %H:%M')}"
+
+
+class CollectorRun(models.Model):
+    """Registro de cada execução de um coletor (duração, chamadas externas, resultado)"""
+    
+    SOURCE_CHOICES = [
+        ('twitter', 'Twitter/X'),
+        ('youtube', 'YouTube'),
+        ('app_store', 'App Store'),
+        ('google_play', 'Google Play'),
+        ('analytics', 'Google Analytics'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('running', 'Em execução'),
+        ('success', 'Sucesso'),
+        ('empty', 'Sem dados'),
+        ('error', 'Erro'),
+    ]
+    
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    
+    # Chamadas às APIs externas (tempo sem contar as esperas de backoff)
+    external_calls = models.IntegerField(default=0)
+    external_seconds = models.FloatField(default=0.0)
+    retries = models.IntegerField(default=0)
+    
+    rows_written = models.IntegerField(default=0)
+    error_class = models.CharField(max_length=100, blank=True, default='')
+    error_message = models.TextField(blank=True, default='')
+    
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['source', 'started_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.source} - {self.status} - {self.started_at.strftime('%d/%m/%Y %H:%M')}"
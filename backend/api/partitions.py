@@ -0,0 +1,225 @@
+"""
+Particionamento mensal (por collected_at) das tabelas de séries temporais.
+
+No PostgreSQL, SocialMetric, AppDownload e WebsiteMetric são tabelas
+particionadas por intervalo: uma partição por mês (no fuso do projeto) e uma
+partição DEFAULT para linhas fora dos meses criados. Consultas filtradas por
+período leem apenas as partições do intervalo (partition pruning), e a
+retenção descarta meses inteiros com DETACH + DROP em vez de um DELETE longo.
+
+Em bancos sem particionamento (SQLite nos testes locais) a retenção apaga as
+linhas em lotes pequenos.
+"""
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import cache, rollups, snapshots
+from .models import MetricRollup
+
+
+def month_start(value):
+    """Início do mês (no fuso do projeto) que contém o instante informado"""
+    local = timezone.localtime(value, timezone.get_default_timezone())
+    return timezone.make_aware(
+        datetime.combine(local.date().replace(day=1), time.min),
+        timezone.get_default_timezone(),
+    )
+
+
+def add_months(start, months):
+    local = timezone.localtime(start, timezone.get_default_timezone())
+    index = local.year * 12 + local.month - 1 + months
+    return timezone.make_aware(
+        datetime(index // 12, index % 12 + 1, 1),
+        timezone.get_default_timezone(),
+    )
+
+
+def partition_name(table, start):
+    local = timezone.localtime(start, timezone.get_default_timezone())
+    return f'{table}_p{local.year:04d}_{local.month:02d}'
+
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+
+def is_partitioned(table, using=connection):
+    if using.vendor != 'postgresql':
+        return False
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def _partitions(cursor, table):
+    cursor.execute(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%s)
+        """,
+        [table],
+    )
+    return {name for name, in cursor.fetchall()}
+
+
+def create_partition(cursor, table, start):
+    """
+    Cria a partição do mês que começa em `start`, se ainda não existir.
+
+    Linhas do mês que estejam na partição DEFAULT são movidas para a nova
+    partição antes do ATTACH. Retorna True se a partição foi criada.
+    """
+    name = partition_name(table, start)
+    if name in _partitions(cursor, table):
+        return False
+
+    end = add_months(start, 1)
+    quote = connection.ops.quote_name
+    cursor.execute(f'CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS)')
+    cursor.execute(
+        f"""
+        WITH moved AS (
+            DELETE FROM {quote(default_partition_name(table))}
+            WHERE collected_at >= %s AND collected_at < %s
+            RETURNING *
+        )
+        INSERT INTO {quote(name)} SELECT * FROM moved
+        """,
+        [start, end],
+    )
+    cursor.execute(
+        f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} FOR VALUES FROM (%s) TO (%s)',
+        [start, end],
+    )
+    return True
+
+
+def ensure_partitions(model, months_ahead=None, since=None):
+    """
+    Cria as partições do mês corrente (ou do mês de `since`, para cargas
+    históricas) até os próximos meses; retorna as criadas.
+    """
+    table = model._meta.db_table
+    if not is_partitioned(table):
+        return []
+
+    if months_ahead is None:
+        months_ahead = settings.METRIC_PARTITION_MONTHS_AHEAD
+
+    now = timezone.now()
+    start = month_start(min(since or now, now))
+    stop = add_months(month_start(now), months_ahead)
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        while start <= stop:
+            if create_partition(cursor, table, start):
+                created.append(partition_name(table, start))
+            start = add_months(start, 1)
+    return created
+
+
+def drop_partitions_before(model, cutoff):
+    """
+    Desanexa e remove as partições mensais inteiramente anteriores a `cutoff`.
+
+    Retorna os nomes das partições removidas.
+    """
+    table = model._meta.db_table
+    if not is_partitioned(table):
+        return []
+
+    quote = connection.ops.quote_name
+    dropped = []
+    with connection.cursor() as cursor:
+        names = sorted(_partitions(cursor, table) - {default_partition_name(table)})
+        for name in names:
+            year, month = name.rsplit('_p', 1)[1].split('_')
+            end = add_months(timezone.make_aware(datetime(int(year), int(month), 1)), 1)
+            if end > cutoff:
+                break
+
+            with transaction.atomic():
+                cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+                cursor.execute(f'DROP TABLE {quote(name)}')
+            dropped.append(name)
+    return dropped
+
+
+def delete_before(model, cutoff, batch_size=None):
+    """
+    Apaga as linhas anteriores a `cutoff` em lotes, cada um em sua transação.
+
+    Não dispara sinais por linha: os dados derivados são ajustados uma vez
+    em `purge`. Retorna o número de linhas apagadas.
+    """
+    batch_size = batch_size or settings.METRIC_DELETE_BATCH_SIZE
+    expired = model.objects.filter(collected_at__lt=cutoff).order_by()
+    deleted = 0
+
+    while True:
+        with transaction.atomic():
+            count = delete_rows(expired.values('pk')[:batch_size])
+        if not count:
+            break
+        deleted += count
+    return deleted
+
+
+def delete_rows(queryset):
+    """
+    Apaga as linhas do queryset com um único DELETE ... WHERE id IN (SELECT ...).
+
+    Ao contrário de QuerySet.delete(), não carrega os objetos nem envia
+    post_delete linha a linha. Retorna o número de linhas apagadas.
+    """
+    model = queryset.model
+    quote = connection.ops.quote_name
+    select, params = queryset.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} '
+            f'WHERE {quote(model._meta.pk.column)} IN ({select})',
+            params,
+        )
+        return cursor.rowcount
+
+
+def purge(model, cutoff):
+    """
+    Remove as métricas anteriores a `cutoff` e ajusta agregados, snapshots e cache.
+
+    Meses inteiros saem por DROP de partição; o restante (mês da borda,
+    partição DEFAULT ou bancos sem particionamento) por `delete_before`.
+    Retorna (partições removidas, linhas apagadas em lote).
+    """
+    dropped = drop_partitions_before(model, cutoff)
+    deleted = delete_before(model, cutoff)
+
+    source = rollups.source_for(model)
+    # Horas inteiras antes do corte (inclusive as do próprio dia do corte) e
+    # dias inteiros antes dele; a hora e o dia que contêm o corte são
+    # recalculados abaixo
+    MetricRollup.objects.filter(
+        Q(granularity='hour', bucket__lt=rollups.bucket_start(cutoff, 'hour'))
+        | Q(granularity='day', bucket__lt=rollups.bucket_start(cutoff, 'day')),
+        source=source,
+    ).delete()
+    if rollups.has_platform(model):
+        platforms = [platform for platform, _ in model.PLATFORM_CHOICES]
+        rollups.refresh(model, [(platform, cutoff) for platform in platforms])
+        snapshots.refresh(model, platforms)
+    else:
+        rollups.refresh(model, [('', cutoff)])
+    cache.invalidate(source)
+
+    return dropped, deleted
@@ -0,0 +1,65 @@
+"""
+Renderers JSON baseados em orjson.
+
+ORJSONRenderer produz o mesmo JSON compacto do JSONRenderer do DRF, com
+serialização muito mais rápida. ColumnarJSONRenderer (?format=columnar)
+transforma listas de objetos em um array por campo, evitando repetir os
+nomes dos campos em cada linha.
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(value):
+    # Tipos que o orjson não conhece (Decimal, lazy strings, querysets...)
+    return _fallback_encoder.default(value)
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            # Saída indentada (API navegável) fica com o encoder padrão
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # OPT_UTC_Z: datas UTC com sufixo Z, como o encoder do DRF
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+def to_columnar(data):
+    """
+    Converte recursivamente listas de objetos com os mesmos campos em
+    {campo: [valores]}; demais valores são mantidos.
+    """
+    if isinstance(data, dict):
+        return {key: to_columnar(value) for key, value in data.items()}
+
+    if isinstance(data, list):
+        if data and all(isinstance(row, dict) for row in data):
+            fields = list(data[0])
+            if all(len(row) == len(fields) and all(field in row for field in fields) for row in data):
+                return {
+                    field: [to_columnar(row[field]) for row in data]
+                    for field in fields
+                }
+        return [to_columnar(value) for value in data]
+
+    return data
+
+
+class ColumnarJSONRenderer(ORJSONRenderer):
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None and response.exception:
+            # Erros mantêm o formato usual
+            return super().render(data, accepted_media_type, renderer_context)
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
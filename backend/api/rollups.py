@@ -0,0 +1,368 @@
+"""
+Agregação incremental das métricas em buckets horários e diários.
+
+Cada linha gravada em SocialMetric, AppDownload ou WebsiteMetric recalcula
+apenas os buckets que a contêm, de modo que as consultas por período leem
+poucas linhas de MetricRollup em vez de varrer as tabelas brutas.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Max, Min, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import METRIC_SOURCES, MetricRollup
+
+GRANULARITIES = ('hour', 'day')
+
+# Quantidade de buckets recalculados por consulta em gravações em lote
+REFRESH_CHUNK_SIZE = 200
+
+# Buckets acumulados em memória antes de gravar durante a reconstrução
+REBUILD_FLUSH_SIZE = 1000
+
+
+def source_for(model):
+    """Retorna o nome da fonte (social, app, website) de um modelo de métricas"""
+    for source, source_model in METRIC_SOURCES.items():
+        if source_model is model:
+            return source
+    raise ValueError(f"Modelo sem agregados: {model.__name__}")
+
+
+def has_platform(model):
+    return any(field.name == 'platform' for field in model._meta.fields)
+
+
+def bucket_start(value, granularity):
+    """Início do bucket (no fuso do projeto) que contém o instante informado"""
+    local = timezone.localtime(value, timezone.get_default_timezone())
+    if granularity == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def bucket_end(start, granularity):
+    if granularity == 'hour':
+        return start + timedelta(hours=1)
+    next_day = timezone.localtime(start, timezone.get_default_timezone()).date() + timedelta(days=1)
+    return timezone.make_aware(datetime.combine(next_day, time.min), timezone.get_default_timezone())
+
+
+def _ceil(value, granularity):
+    start = bucket_start(value, granularity)
+    if start == value:
+        return start
+    return bucket_end(start, granularity)
+
+
+class _Accumulator:
+    """Acumula estatísticas por (plataforma, granularidade, bucket, campo)"""
+
+    def __init__(self, source, fields):
+        self.source = source
+        self.fields = fields
+        self.stats = {}
+
+    def add(self, platform, collected_at, values):
+        for granularity in GRANULARITIES:
+            key = (platform, granularity, bucket_start(collected_at, granularity))
+            bucket = self.stats.setdefault(key, {})
+
+            for field, value in zip(self.fields, values):
+                if value is None:
+                    continue
+                stat = bucket.get(field)
+                if stat is None:
+                    bucket[field] = [1, value, value, value, value, collected_at]
+                    continue
+                stat[0] += 1
+                stat[1] += value
+                stat[2] = min(stat[2], value)
+                stat[3] = max(stat[3], value)
+                # Linhas chegam ordenadas por (platform,) collected_at, id
+                stat[4] = value
+                stat[5] = collected_at
+
+    def rollups(self, keys=None):
+        for key, bucket in self.stats.items():
+            if keys is not None and key not in keys:
+                continue
+            platform, granularity, start = key
+            for field, (count, total, minimum, maximum, last_value, last_at) in bucket.items():
+                yield MetricRollup(
+                    source=self.source,
+                    platform=platform,
+                    field=field,
+                    granularity=granularity,
+                    bucket=start,
+                    count=count,
+                    total=total,
+                    minimum=minimum,
+                    maximum=maximum,
+                    last_value=last_value,
+                    last_collected_at=last_at,
+                )
+
+    def clear(self):
+        self.stats = {}
+
+
+def _rows(model, queryset, fields):
+    columns = ['platform'] if has_platform(model) else []
+    columns += ['collected_at'] + list(fields)
+    rows = queryset.order_by(*columns[:-len(fields)], 'id').values_list(*columns)
+
+    for row in rows.iterator(chunk_size=5000):
+        if columns[0] == 'platform':
+            yield row[0], row[1], row[2:]
+        else:
+            yield '', row[0], row[1:]
+
+
+def _save(rollups):
+    MetricRollup.objects.bulk_create(
+        rollups,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['source', 'platform', 'field', 'granularity', 'bucket'],
+        update_fields=[
+            'count', 'total', 'minimum', 'maximum',
+            'last_value', 'last_collected_at', 'updated_at',
+        ],
+    )
+
+
+def refresh(model, keys):
+    """
+    Recalcula os buckets que contêm as posições informadas.
+
+    keys: iterável de tuplas (platform, collected_at); use '' como
+    plataforma para modelos sem esse campo.
+    """
+    keys = list(set(keys))
+    for offset in range(0, len(keys), REFRESH_CHUNK_SIZE):
+        _refresh_chunk(model, keys[offset:offset + REFRESH_CHUNK_SIZE])
+
+
+def _refresh_chunk(model, keys):
+    source = source_for(model)
+    fields = model.ROLLUP_FIELDS
+
+    targets = set()
+    days = set()
+    for platform, collected_at in keys:
+        for granularity in GRANULARITIES:
+            targets.add((platform, granularity, bucket_start(collected_at, granularity)))
+        days.add((platform, bucket_start(collected_at, 'day')))
+
+    # Uma única leitura cobre todos os dias afetados (e suas horas)
+    window = Q()
+    for platform, day in days:
+        condition = Q(collected_at__gte=day, collected_at__lt=bucket_end(day, 'day'))
+        if platform:
+            condition &= Q(platform=platform)
+        window |= condition
+
+    accumulator = _Accumulator(source, fields)
+    for platform, collected_at, values in _rows(model, model.objects.filter(window), fields):
+        accumulator.add(platform, collected_at, values)
+
+    rollups = list(accumulator.rollups(targets))
+    if rollups:
+        _save(rollups)
+
+    # Remove campos que deixaram de ter valores (linhas apagadas ou zeradas)
+    stale = Q()
+    for target in targets:
+        present = list(accumulator.stats.get(target, {}))
+        if len(present) == len(fields):
+            continue
+        platform, granularity, start = target
+        condition = Q(platform=platform, granularity=granularity, bucket=start)
+        if present:
+            condition &= ~Q(field__in=present)
+        stale |= condition
+
+    if stale:
+        MetricRollup.objects.filter(stale, source=source).delete()
+
+
+def rebuild(model):
+    """Reconstrói todos os agregados de um modelo a partir das linhas brutas"""
+    source = source_for(model)
+    fields = model.ROLLUP_FIELDS
+    MetricRollup.objects.filter(source=source).delete()
+
+    accumulator = _Accumulator(source, fields)
+    current_day = None
+    total = 0
+
+    for platform, collected_at, values in _rows(model, model.objects.all(), fields):
+        day = (platform, bucket_start(collected_at, 'day'))
+        # Dias anteriores já estão completos; grava em blocos
+        if day != current_day and len(accumulator.stats) >= REBUILD_FLUSH_SIZE:
+            rollups = list(accumulator.rollups())
+            _save(rollups)
+            total += len(rollups)
+            accumulator.clear()
+        current_day = day
+        accumulator.add(platform, collected_at, values)
+
+    rollups = list(accumulator.rollups())
+    if rollups:
+        _save(rollups)
+        total += len(rollups)
+
+    return total
+
+
+def totals(model, fields, start=None, end=None, platform=None):
+    """
+    Soma os campos entre start e end (inclusive) usando os agregados.
+
+    Horas e dias completos são lidos de MetricRollup; apenas as frações de
+    hora nas bordas do intervalo são somadas a partir das linhas brutas.
+    Retorna None para campos sem dados, como o Sum do ORM.
+    """
+    source = source_for(model)
+    raw = None
+
+    if start is None:
+        end = None
+        rolled = Q(granularity='day')
+    else:
+        first_hour = _ceil(start, 'hour')
+        first_day = _ceil(start, 'day')
+        raw = Q(collected_at__gte=start, collected_at__lt=first_hour)
+
+        if end is None:
+            rolled = (
+                Q(granularity='hour', bucket__gte=first_hour, bucket__lt=first_day)
+                | Q(granularity='day', bucket__gte=first_day)
+            )
+        else:
+            last_hour = bucket_start(end, 'hour')
+            last_day = bucket_start(end, 'day')
+
+            if last_hour <= first_hour:
+                # Intervalo contido em uma única hora
+                raw = Q(collected_at__gte=start, collected_at__lte=end)
+                rolled = None
+            elif last_day <= first_day:
+                raw |= Q(collected_at__gte=last_hour, collected_at__lte=end)
+                rolled = Q(granularity='hour', bucket__gte=first_hour, bucket__lt=last_hour)
+            else:
+                raw |= Q(collected_at__gte=last_hour, collected_at__lte=end)
+                rolled = (
+                    Q(granularity='hour', bucket__gte=first_hour, bucket__lt=first_day)
+                    | Q(granularity='day', bucket__gte=first_day, bucket__lt=last_day)
+                    | Q(granularity='hour', bucket__gte=last_day, bucket__lt=last_hour)
+                )
+
+    result = dict.fromkeys(fields)
+
+    def _add(field, value):
+        if value is None:
+            return
+        result[field] = value if result[field] is None else result[field] + value
+
+    if rolled is not None:
+        rollups = MetricRollup.objects.filter(rolled, source=source, field__in=fields)
+        if platform:
+            rollups = rollups.filter(platform=platform)
+        for row in rollups.order_by().values('field').annotate(value=Sum('total')):
+            _add(row['field'], row['value'])
+
+    if raw is not None:
+        queryset = model.objects.filter(raw)
+        if platform:
+            queryset = queryset.filter(platform=platform)
+        edges = queryset.aggregate(**{field: Sum(field) for field in fields})
+        for field in fields:
+            _add(field, edges[field])
+
+    # Agregados são armazenados como float; preserva o tipo do campo original
+    for field in fields:
+        if result[field] is not None and model._meta.get_field(field).get_internal_type() == 'IntegerField':
+            result[field] = int(round(result[field]))
+
+    return result
+
+
+def window(start, end):
+    """
+    Filtro dos agregados que cobrem [start, end) com start e end em horas
+    cheias: dias completos pelos buckets diários, as bordas pelos horários.
+    """
+    first_day = _ceil(start, 'day')
+    last_day = bucket_start(end, 'day')
+
+    if last_day <= first_day:
+        return Q(granularity='hour', bucket__gte=start, bucket__lt=end)
+
+    return (
+        Q(granularity='hour', bucket__gte=start, bucket__lt=first_day)
+        | Q(granularity='day', bucket__gte=first_day, bucket__lt=last_day)
+        | Q(granularity='hour', bucket__gte=last_day, bucket__lt=end)
+    )
+
+
+def compare(model, fields, windows, platform=None):
+    """
+    Estatísticas dos campos em várias janelas de tempo, por plataforma, em
+    uma única consulta agrupada com agregação condicional.
+
+    `windows` mapeia um nome para (start, end) em horas cheias. Retorna
+    {platform: {janela: {campo: {avg, min, max, sum, last, samples}}}}; a
+    média é ponderada pela quantidade de amostras de cada bucket, como a
+    média das linhas brutas. `last` é o último valor coletado na janela
+    (last_value do bucket com o maior last_collected_at), lido por uma
+    subconsulta correlacionada à plataforma na mesma consulta. Campos sem
+    dados na janela ficam com valores None.
+    """
+    source = source_for(model)
+    covered = Q()
+    aggregates = {}
+    names = {}
+
+    for name, (start, end) in windows.items():
+        rows = window(start, end)
+        covered |= rows
+        for field in fields:
+            matching = rows & Q(field=field)
+            alias = f'w{len(names)}'
+            names[alias] = (name, field)
+            aggregates[f'{alias}_sum'] = Sum('total', filter=matching)
+            aggregates[f'{alias}_samples'] = Sum('count', filter=matching)
+            aggregates[f'{alias}_min'] = Min('minimum', filter=matching)
+            aggregates[f'{alias}_max'] = Max('maximum', filter=matching)
+            aggregates[f'{alias}_last'] = Subquery(
+                MetricRollup.objects.filter(
+                    matching,
+                    source=source,
+                    platform=OuterRef('platform'),
+                    last_collected_at__isnull=False,
+                )
+                .order_by('-last_collected_at')
+                .values('last_value')[:1]
+            )
+
+    rollups = MetricRollup.objects.filter(covered, source=source, field__in=fields)
+    if platform:
+        rollups = rollups.filter(platform=platform)
+
+    result = {}
+    for row in rollups.order_by().values('platform').annotate(**aggregates):
+        stats = result.setdefault(row['platform'], {})
+        for alias, (name, field) in names.items():
+            total, samples = row[f'{alias}_sum'], row[f'{alias}_samples']
+            stats.setdefault(name, {})[field] = {
+                'avg': total / samples if samples else None,
+                'min': row[f'{alias}_min'],
+                'max': row[f'{alias}_max'],
+                'sum': total,
+                'last': row[f'{alias}_last'],
+                'samples': samples or 0,
+            }
+
+    return result
@@ -0,0 +1,86 @@
+"""
+Roteamento de leituras para a réplica do PostgreSQL.
+
+Só as leituras de requisições GET/HEAD (listagens, resumo, séries,
+análises) vão para o alias `replica`, quando ele está configurado; gravações,
+tarefas do Celery, comandos e qualquer código fora de uma requisição usam
+sempre o `default` (primário).
+
+Como a réplica pode estar alguns segundos atrás do primário, as leituras
+voltam ao primário por REPLICA_STICKY_SECONDS:
+
+- para o cliente que acabou de gravar (POST/PUT/PATCH/DELETE), identificado
+  pelo header Authorization (ou pelo IP), para que ele veja a própria gravação;
+- para todos, após qualquer gravação de métricas (a mesma que troca a geração
+  do cache), para que a resposta recalculada e guardada no cache não venha
+  de uma réplica atrasada.
+"""
+import hashlib
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA = 'replica'
+
+KEY_PREFIX = 'replica:pin'
+LAST_WRITE_KEY = f'{KEY_PREFIX}:last-write'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+class ReplicaRouter:
+    """Leituras na réplica só dentro de requisições marcadas pelo ReplicaMiddleware"""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured():
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e primário têm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def record_write():
+    """Marca uma gravação: leituras voltam ao primário até a réplica alcançar"""
+    if replica_configured():
+        cache.set(LAST_WRITE_KEY, time.time(), settings.REPLICA_STICKY_SECONDS)
+
+
+def client_key(request):
+    """Chave de aderência do cliente: header Authorization ou, sem ele, o IP"""
+    identity = request.headers.get('Authorization') or request.META.get('REMOTE_ADDR', '')
+    return f'{KEY_PREFIX}:client:{hashlib.md5(identity.encode()).hexdigest()}'
+
+
+def pin_client(request):
+    """Leituras do cliente voltam ao primário até a réplica alcançar a gravação dele"""
+    cache.set(client_key(request), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def use_replica(request):
+    """
+    Marca a requisição de leitura para usar a réplica, salvo se ela estiver
+    presa ao primário. Retorna o token para `release`.
+    """
+    # Uma consulta ao cache decide as duas regras de aderência
+    pinned = cache.get_many([client_key(request), LAST_WRITE_KEY])
+    return _use_replica.set(not pinned)
+
+
+def release(token):
+    _use_replica.reset(token)
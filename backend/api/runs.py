@@ -0,0 +1,58 @@
+"""
+Registro das execuções dos coletores (CollectorRun).
+
+Cada execução grava uma linha ao começar (status "running") e a atualiza ao
+terminar com duração, linhas gravadas, tempo gasto nas APIs externas,
+tentativas repetidas e a classe do erro, se houver. As chamadas externas
+são contabilizadas por clients.call_with_retry na execução corrente.
+"""
+import time
+from contextvars import ContextVar
+
+from django.utils import timezone
+
+from . import cache, metrics
+from .models import CollectorRun
+
+_current = ContextVar('collector_run', default=None)
+
+
+def record_call(duration, retries=0):
+    """Soma uma chamada externa à execução corrente (se houver uma)"""
+    run = _current.get()
+    if run is None:
+        return
+    run.external_calls += 1
+    run.external_seconds += duration
+    run.retries += retries
+
+
+def execute(source, func, *args, **kwargs):
+    """
+    Executa o coletor registrando a execução; retorna as linhas gravadas.
+
+    Erros são registrados e não se propagam, para não interromper a rodada
+    de coleta (chord) das demais fontes.
+    """
+    run = CollectorRun.objects.create(source=source, started_at=timezone.now())
+    cache.invalidate('runs')
+    token = _current.set(run)
+    started = time.perf_counter()
+
+    try:
+        run.rows_written = func(*args, **kwargs) or 0
+        run.status = 'success' if run.rows_written else 'empty'
+    except Exception as exc:
+        run.status = 'error'
+        run.error_class = type(exc).__name__
+        run.error_message = str(exc)[:2000]
+    finally:
+        _current.reset(token)
+
+    run.duration_seconds = time.perf_counter() - started
+    run.finished_at = timezone.now()
+    run.save()
+    cache.invalidate('runs')
+    metrics.observe_collector_run(run)
+
+    return run.rows_written
@@ -1,8 +1,107 @@
+from django.utils import timezone
 from rest_framework import serializers
-from .models import SocialMetric, AppDownload, WebsiteMetric, ManualEntry
+from .models import SocialMetric, AppDownload, WebsiteMetric, ManualEntry, CollectorRun, MetricAnomaly
 
 
-class SocialMetricSerializer(serializers.ModelSerializer):
+def requested_fields(serializer_class, raw):
+    """
+    Campos pedidos em `?fields=a,b` (sparse fieldsets), na ordem do Meta.
+    
+    Lista vazia (`?fields=,`) e nomes que o serializer não tem geram erro 400.
+    """
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    if not names:
+        raise serializers.ValidationError({'error': 'No fields requested'})
+    invalid = names - set(serializer_class.Meta.fields)
+    if invalid:
+        raise serializers.ValidationError(
+            {'error': f"Invalid fields: {', '.join(sorted(invalid))}"}
+        )
+    return [name for name in serializer_class.Meta.fields if name in names]
+
+
+def model_column(serializer_class, name):
+    """Coluna do modelo lida pelo campo `name` do serializer"""
+    declared = serializer_class._declared_fields.get(name)
+    source = getattr(declared, 'source', None) or name
+    # get_platform_display lê a coluna platform
+    if source.startswith('get_') and source.endswith('_display'):
+        source = source[len('get_'):-len('_display')]
+    return source
+
+
+def model_columns(serializer_class, fields):
+    """Colunas do modelo necessárias para serializar `fields`"""
+    return list(dict.fromkeys(model_column(serializer_class, name) for name in fields))
+
+
+class SparseFieldsMixin:
+    """
+    Aceita o argumento `fields` (lista de nomes) e mantém só esses campos;
+    sem ele, todos os campos do Meta.
+    """
+    
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ValuesSerializer:
+    """
+    Serialização de listagens a partir de .values(), com a mesma saída do
+    ModelSerializer `serializer_class`.
+    
+    Não cria instâncias do modelo nem passa pelos campos do DRF: cada linha
+    é um dict de colunas, e só datas/horas (fuso atual, ISO 8601 com "Z" em
+    UTC), floats e rótulos de choices (dicionário pré-calculado, no lugar de
+    get_<campo>_display) são convertidos.
+    """
+    
+    def __init__(self, serializer_class, fields=None):
+        model = serializer_class.Meta.model
+        fields = fields or serializer_class.Meta.fields
+        
+        self.columns = model_columns(serializer_class, fields)
+        self.converters = []
+        for name in fields:
+            source = model_column(serializer_class, name)
+            model_field = model._meta.get_field(source)
+            converter = None
+            if name != source and model_field.choices:
+                labels = {value: str(label) for value, label in model_field.flatchoices}
+                converter = lambda value, labels=labels: labels.get(value, value)
+            elif model_field.get_internal_type() == 'DateTimeField':
+                converter = self._datetime
+            elif model_field.get_internal_type() == 'FloatField':
+                converter = self._float
+            self.converters.append((name, source, converter))
+    
+    @staticmethod
+    def _float(value):
+        return None if value is None else float(value)
+    
+    def _datetime(self, value):
+        if value is None:
+            return None
+        value = value.astimezone(self.timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    
+    def to_representation(self, rows):
+        """Lista de dicts no formato do serializer a partir de dicts de colunas"""
+        self.timezone = timezone.get_current_timezone()
+        converters = self.converters
+        return [
+            {
+                name: converter(row[source]) if converter else row[source]
+                for name, source, converter in converters
+            }
+            for row in rows
+        ]
+
+
+class SocialMetricSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     platform_display = serializers.CharField(source='get_platform_display', read_only=True)
     
     class Meta:
@@ -15,7 +114,7 @@ class SocialMetricSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class AppDownloadSerializer(serializers.ModelSerializer):
+class AppDownloadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     platform_display = serializers.CharField(source='get_platform_display', read_only=True)
     
     class Meta:
@@ -29,7 +128,7 @@ class AppDownloadSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class WebsiteMetricSerializer(serializers.ModelSerializer):
+class WebsiteMetricSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = WebsiteMetric
         fields = [
@@ -41,7 +140,7 @@ class WebsiteMetricSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class ManualEntrySerializer(serializers.ModelSerializer):
+class ManualEntrySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     platform_display = serializers.CharField(source='get_platform_display', read_only=True)
     
     class Meta:
@@ -54,6 +153,28 @@ class ManualEntrySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class CollectorRunSerializer(serializers.ModelSerializer):
+    source_display = serializers.CharField(source='get_source_display', read_only=True)
+    
+    class Meta:
+        model = CollectorRun
+        fields = [
+            'id', 'source', 'source_display', 'status', 'started_at',
+            'finished_at', 'duration_seconds', 'external_calls',
+            'external_seconds', 'retries', 'rows_written',
+            'error_class', 'error_message'
+        ]
+
+
+class MetricAnomalySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MetricAnomaly
+        fields = [
+            'id', 'source', 'platform', 'field', 'collected_at',
+            'value', 'expected', 'score', 'detected_at'
+        ]
+
+
 class DashboardSummarySerializer(serializers.Serializer):
     """Serializer para resumo do dashboard"""
     
@@ -0,0 +1,110 @@
+"""
+Séries temporais para gráficos: agrupamento por hora/dia/semana no banco
+(fuso America/Sao_Paulo) e redução opcional de pontos com LTTB
+(Largest-Triangle-Three-Buckets).
+"""
+from django.db.models import Avg, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+from django.utils import timezone
+
+from .rollups import has_platform
+
+BUCKETS = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+}
+
+# LTTB sempre mantém o primeiro e o último ponto e escolhe ao menos um entre eles
+LTTB_MIN_POINTS = 3
+
+AGGREGATES = {
+    'avg': Avg,
+    'sum': Sum,
+    'min': Min,
+    'max': Max,
+}
+
+
+def bucketed(queryset, fields, bucket='day', agg='avg'):
+    """
+    Agrupa o queryset por plataforma e bucket, agregando os campos.
+
+    Retorna {platform: [(bucket, {field: valor}), ...]} com os buckets em
+    ordem cronológica; modelos sem plataforma usam a chave None.
+    """
+    trunc = BUCKETS[bucket]('collected_at', tzinfo=timezone.get_default_timezone())
+    aggregate = AGGREGATES[agg]
+    group = ['platform', 'bucket'] if has_platform(queryset.model) else ['bucket']
+
+    rows = (
+        queryset.order_by()
+        .annotate(bucket=trunc)
+        .values(*group)
+        .annotate(**{field: aggregate(field) for field in fields})
+        .order_by(*group)
+    )
+
+    series = {}
+    for row in rows:
+        values = {field: row[field] for field in fields}
+        series.setdefault(row.get('platform'), []).append((row['bucket'], values))
+    return series
+
+
+def lttb(points, threshold):
+    """
+    Seleciona até `threshold` pontos preservando a forma da série.
+
+    points: lista de (x, y) ordenada por x. Retorna os índices escolhidos;
+    o primeiro e o último ponto são sempre mantidos. Valores y nulos contam
+    como zero na escolha, mas os pontos originais são devolvidos intactos.
+    """
+    size = len(points)
+    if threshold >= size or threshold < LTTB_MIN_POINTS:
+        return list(range(size))
+
+    xs = [x for x, _ in points]
+    ys = [y or 0 for _, y in points]
+
+    selected = [0]
+    every = (size - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Média do próximo bucket (terceiro vértice do triângulo)
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, size)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        # Ponto do bucket atual que forma o maior triângulo
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best_area = -1
+        best = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+
+        selected.append(best)
+        a = best
+
+    selected.append(size - 1)
+    return selected
+
+
+def downsample(points, max_points, field):
+    """Aplica LTTB sobre [(bucket, valores)] usando `field` como eixo y"""
+    if not max_points or len(points) <= max_points:
+        return points
+
+    indices = lttb(
+        [(bucket.timestamp(), values[field]) for bucket, values in points],
+        max_points,
+    )
+    return [points[index] for index in indices]
@@ -0,0 +1,86 @@
+"""
+Sinais que mantêm os dados derivados em dia com as tabelas de métricas.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from . import anomalies, cache, live, rollups, snapshots
+from .models import METRIC_SOURCES, ManualEntry
+
+# Disparado quando linhas de métricas são gravadas ou removidas.
+# Argumentos: sender (modelo), instances (linhas afetadas) e stale
+# (posições (platform, collected_at) que as linhas ocupavam antes da gravação);
+# remoções enviam também deleted=True.
+metrics_written = Signal()
+
+
+def _position(instance):
+    return (getattr(instance, 'platform', ''), instance.collected_at)
+
+
+def remember_previous_position(sender, instance, **kwargs):
+    """Guarda a posição anterior da linha para recalcular o bucket antigo"""
+    if instance.pk is None:
+        return
+
+    previous = sender.objects.filter(pk=instance.pk).first()
+    if previous and _position(previous) != _position(instance):
+        instance._previous_position = _position(previous)
+
+
+def metric_saved(sender, instance, **kwargs):
+    stale = []
+    previous = getattr(instance, '_previous_position', None)
+    if previous:
+        stale.append(previous)
+        del instance._previous_position
+
+    metrics_written.send(sender=sender, instances=[instance], stale=stale)
+
+
+def metric_deleted(sender, instance, **kwargs):
+    metrics_written.send(sender=sender, instances=[instance], stale=[], deleted=True)
+
+
+# Conectados por modelo, e não a todos os modelos: um receiver global de
+# post_delete obriga o Django a carregar e apagar linha a linha qualquer
+# QuerySet.delete() (por exemplo, dos agregados em MetricRollup)
+for _model in METRIC_SOURCES.values():
+    pre_save.connect(remember_previous_position, sender=_model)
+    post_save.connect(metric_saved, sender=_model)
+    post_delete.connect(metric_deleted, sender=_model)
+
+
+@receiver(post_save, sender=ManualEntry)
+@receiver(post_delete, sender=ManualEntry)
+def manual_entry_written(sender, instance, signal, **kwargs):
+    cache.invalidate('manual')
+    live.publish('manual', [instance], deleted=signal is post_delete)
+
+
+@receiver(metrics_written)
+def refresh_rollups(sender, instances, stale=(), **kwargs):
+    keys = [_position(instance) for instance in instances]
+    rollups.refresh(sender, keys + list(stale))
+
+
+@receiver(metrics_written)
+def refresh_snapshots(sender, instances, stale=(), **kwargs):
+    platforms = [_position(instance)[0] for instance in instances]
+    snapshots.refresh(sender, platforms + [platform for platform, _ in stale])
+
+
+@receiver(metrics_written)
+def detect_anomalies(sender, instances, deleted=False, **kwargs):
+    if not deleted:
+        anomalies.observe(sender, instances)
+
+
+@receiver(metrics_written)
+def invalidate_cached_responses(sender, **kwargs):
+    cache.invalidate(rollups.source_for(sender))
+
+
+@receiver(metrics_written)
+def publish_live_deltas(sender, instances, deleted=False, **kwargs):
+    live.publish(rollups.source_for(sender), instances, deleted)
@@ -0,0 +1,104 @@
+"""
+Valores atuais por plataforma.
+
+MetricSnapshot guarda o id da linha mais recente de cada (fonte, plataforma),
+então buscar "os números de agora" é uma única consulta indexada, não importa
+quantas plataformas existam. latest_per_group() é o fallback em uma consulta
+(DISTINCT ON no PostgreSQL, ROW_NUMBER() nos demais bancos).
+"""
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import MetricSnapshot
+from .rollups import has_platform, source_for
+
+
+def latest_per_group(queryset, partition=('platform',), field='collected_at'):
+    """Linha mais recente (field, id) de cada grupo em uma única consulta"""
+    ordering = [F(field).desc(), F('id').desc()]
+
+    if connection.features.can_distinct_on_fields:
+        return queryset.order_by(*partition, f'-{field}', '-id').distinct(*partition)
+
+    return queryset.annotate(
+        _row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F(field) for field in partition],
+            order_by=ordering,
+        )
+    ).filter(_row_number=1)
+
+
+def _latest_rows(model, queryset=None):
+    if queryset is None:
+        queryset = model.objects.all()
+    if has_platform(model):
+        return latest_per_group(queryset)
+    return queryset.order_by('-collected_at', '-id')[:1]
+
+
+def _in_choice_order(model, rows):
+    if not has_platform(model):
+        return list(rows)
+    order = {value: index for index, (value, _) in enumerate(model.PLATFORM_CHOICES)}
+    return sorted(rows, key=lambda row: order.get(row.platform, len(order)))
+
+
+def latest(model, fields=None):
+    """
+    Linhas mais recentes de cada plataforma, na ordem de PLATFORM_CHOICES.
+
+    Com `fields`, só essas colunas (e a plataforma) são lidas.
+    """
+    queryset = model.objects.all()
+    if fields is not None:
+        queryset = queryset.only(*fields, *(['platform'] if has_platform(model) else []))
+
+    snapshot_ids = MetricSnapshot.objects.filter(source=source_for(model)).values('row_id')
+    rows = list(queryset.filter(pk__in=snapshot_ids))
+
+    if not rows:
+        # Snapshots ainda não construídos (ou tabela vazia)
+        rows = list(_latest_rows(model, queryset))
+
+    return _in_choice_order(model, rows)
+
+
+def refresh(model, platforms):
+    """Recalcula o snapshot das plataformas afetadas por uma gravação"""
+    source = source_for(model)
+
+    for platform in set(platforms):
+        queryset = model.objects.all()
+        if platform:
+            queryset = queryset.filter(platform=platform)
+        row = queryset.order_by('-collected_at', '-id').values('id', 'collected_at').first()
+
+        if row is None:
+            MetricSnapshot.objects.filter(source=source, platform=platform).delete()
+            continue
+
+        MetricSnapshot.objects.update_or_create(
+            source=source,
+            platform=platform,
+            defaults={'row_id': row['id'], 'collected_at': row['collected_at']},
+        )
+
+
+def rebuild(model):
+    """Reconstrói os snapshots de um modelo com uma única consulta"""
+    source = source_for(model)
+    MetricSnapshot.objects.filter(source=source).delete()
+
+    snapshots = [
+        MetricSnapshot(
+            source=source,
+            platform=getattr(row, 'platform', ''),
+            row_id=row.id,
+            collected_at=row.collected_at,
+        )
+        for row in _latest_rows(model)
+    ]
+    MetricSnapshot.objects.bulk_create(snapshots)
+    return len(snapshots)
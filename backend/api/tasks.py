@@ -1,29 +1,76 @@
-from celery import shared_task
+import functools
+
+from celery import chord, shared_task
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from .models import SocialMetric, AppDownload, WebsiteMetric
-import tweepy
-import requests
-from datetime import datetime, timedelta
+from . import cache, clients, partitions, rollups, runs
+from .ingest import upsert
+from .models import METRIC_SOURCES, SocialMetric, AppDownload, WebsiteMetric, CollectorWatermark, CollectorRun, MetricAnomaly
+from datetime import datetime, time, timedelta
 
 
-@shared_task
+# Coletores rodam com limite de tempo para que uma API lenta não segure a rodada
+collector_task = shared_task(
+    soft_time_limit=settings.COLLECTOR_TIME_LIMIT,
+    time_limit=settings.COLLECTOR_TIME_LIMIT + 30,
+)
+
+
+def collector(source):
+    """
+    Registra o coletor como tarefa com limite de tempo e cada execução em
+    CollectorRun. Erros são registrados e a tarefa retorna 0 linhas.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def run():
+            return runs.execute(source, func)
+        return collector_task(run)
+    return decorator
+
+
+def get_watermark(source):
+    """Retorna o último instante já coletado da fonte (None na primeira coleta)"""
+    return CollectorWatermark.objects.filter(source=source).values_list('value', flat=True).first()
+
+
+def save_collected(source, model, objs, watermark):
+    """
+    Grava as linhas coletadas (upsert pela chave natural) e avança a marca
+    d'água da fonte na mesma transação. Retorna as linhas gravadas.
+    """
+    with transaction.atomic():
+        written = upsert(model, objs)
+        CollectorWatermark.objects.update_or_create(source=source, defaults={'value': watermark})
+    return written
+
+
+@collector('twitter')
 def fetch_twitter_metrics():
     """Busca métricas do Twitter/X"""
     
     if not settings.TWITTER_BEARER_TOKEN:
         print("Twitter Bearer Token não configurado")
-        return
+        return 0
+    
+    # Um valor por hora: a hora corrente já coletada não é buscada de novo
+    hour = rollups.bucket_start(timezone.now(), 'hour')
+    watermark = get_watermark('twitter')
+    if watermark and watermark >= hour:
+        print("Twitter metrics desta hora já coletadas")
+        return 0
     
     try:
-        # Configuração do Tweepy
-        client = tweepy.Client(bearer_token=settings.TWITTER_BEARER_TOKEN)
+        # Cliente reaproveitado entre execuções do worker
+        client = clients.twitter_client(settings.TWITTER_BEARER_TOKEN)
         
         # Buscar informações do usuário
         # Nota: Você precisa definir o username do COR
         username = "OperacoesRio"  # Ajustar conforme necessário
         
-        user = client.get_user(
+        user = clients.call_with_retry(
+            client.get_user,
             username=username,
             user_fields=['public_metrics']
         )
@@ -31,32 +78,41 @@ def fetch_twitter_metrics():
         if user.data:
             metrics = user.data.public_metrics
             
-            SocialMetric.objects.create(
+            metric = SocialMetric(
                 platform='twitter',
                 followers=metrics.get('followers_count', 0),
                 following=metrics.get('following_count', 0),
                 posts_count=metrics.get('tweet_count', 0),
-                collected_at=timezone.now()
+                collected_at=hour
             )
+            rows_written = save_collected('twitter', SocialMetric, [metric], hour)
             
             print(f"Twitter metrics coletadas: {metrics.get('followers_count', 0)} seguidores")
+            return rows_written
         
     except Exception as e:
         print(f"Erro ao coletar métricas do Twitter: {str(e)}")
+        raise
+    
+    return 0
 
 
-@shared_task
+@collector('youtube')
 def fetch_youtube_metrics():
     """Busca métricas do YouTube"""
     
     if not settings.YOUTUBE_API_KEY or not settings.YOUTUBE_CHANNEL_ID:
         print("YouTube API Key ou Channel ID não configurados")
-        return
+        return 0
+    
+    hour = rollups.bucket_start(timezone.now(), 'hour')
+    watermark = get_watermark('youtube')
+    if watermark and watermark >= hour:
+        print("YouTube metrics desta hora já coletadas")
+        return 0
     
     try:
-        from googleapiclient.discovery import build
-        
-        youtube = build('youtube', 'v3', developerKey=settings.YOUTUBE_API_KEY)
+        youtube = clients.youtube_service(settings.YOUTUBE_API_KEY)
         
         # Buscar estatísticas do canal
         request = youtube.channels().list(
@@ -64,48 +120,44 @@ def fetch_youtube_metrics():
             id=settings.YOUTUBE_CHANNEL_ID
         )
         
-        response = request.execute()
+        response = clients.call_with_retry(request.execute)
         
         if response['items']:
             stats = response['items'][0]['statistics']
             
-            SocialMetric.objects.create(
+            metric = SocialMetric(
                 platform='youtube',
                 followers=int(stats.get('subscriberCount', 0)),
                 posts_count=int(stats.get('videoCount', 0)),
                 views=int(stats.get('viewCount', 0)),
-                collected_at=timezone.now()
+                collected_at=hour
             )
+            rows_written = save_collected('youtube', SocialMetric, [metric], hour)
             
             print(f"YouTube metrics coletadas: {stats.get('subscriberCount', 0)} inscritos")
+            return rows_written
     
     except Exception as e:
         print(f"Erro ao coletar métricas do YouTube: {str(e)}")
+        raise
+    
+    return 0
 
 
-@shared_task
+@collector('google_play')
 def fetch_google_play_metrics():
     """Busca métricas do Google Play"""
     
     if not settings.GOOGLE_PLAY_PACKAGE_NAME:
         print("Google Play Package Name não configurado")
-        return
+        return 0
     
     try:
         # Esta é uma implementação simplificada
         # Em produção, você precisará usar a Google Play Developer API
         # com autenticação OAuth2
         
-        from google.oauth2 import service_account
-        from googleapiclient.discovery import build
-        
-        # Carregar credenciais
-        credentials = service_account.Credentials.from_service_account_file(
-            settings.GOOGLE_PLAY_SERVICE_ACCOUNT,
-            scopes=['https://www.googleapis.com/auth/androidpublisher']
-        )
-        
-        service = build('androidpublisher', 'v3', credentials=credentials)
+        service = clients.android_publisher_service(settings.GOOGLE_PLAY_SERVICE_ACCOUNT)
         
         # Aqui você implementaria a lógica específica para buscar
         # estatísticas do seu app no Google Play
@@ -115,25 +167,28 @@ def fetch_google_play_metrics():
         
     except Exception as e:
         print(f"Erro ao coletar métricas do Google Play: {str(e)}")
+        raise
+    
+    return 0
 
 
-@shared_task
+@collector('app_store')
 def fetch_app_store_metrics():
     """Busca métricas da App Store"""
     
     if not settings.APPLE_APP_ID:
         print("Apple App ID não configurado")
-        return
+        return 0
     
     try:
         # App Store Connect API requer autenticação JWT
         # Esta é uma implementação simplificada
         
         import jwt
-        from datetime import datetime, timedelta
         
         # Gerar JWT token
-        private_key = open(settings.APPLE_PRIVATE_KEY_PATH, 'r').read()
+        with open(settings.APPLE_PRIVATE_KEY_PATH, 'r') as key_file:
+            private_key = key_file.read()
         
         token = jwt.encode(
             {
@@ -157,7 +212,7 @@ def fetch_app_store_metrics():
         # Endpoint para analytics
         url = f'https://api.appstoreconnect.apple.com/v1/apps/{settings.APPLE_APP_ID}/perfPowerMetrics'
         
-        response = requests.get(url, headers=headers)
+        response = clients.get(url, headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -168,32 +223,36 @@ def fetch_app_store_metrics():
     
     except Exception as e:
         print(f"Erro ao coletar métricas da App Store: {str(e)}")
+        raise
+    
+    return 0
 
 
-@shared_task
+@collector('analytics')
 def fetch_analytics_metrics():
     """Busca métricas do Google Analytics"""
     
     if not settings.GOOGLE_ANALYTICS_PROPERTY_ID:
         print("Google Analytics Property ID não configurado")
-        return
+        return 0
     
     try:
-        from google.analytics.data_v1beta import BetaAnalyticsDataClient
         from google.analytics.data_v1beta.types import RunReportRequest, DateRange, Metric, Dimension
-        from google.oauth2 import service_account
         
-        # Carregar credenciais
-        credentials = service_account.Credentials.from_service_account_file(
-            settings.GOOGLE_ANALYTICS_CREDENTIALS
-        )
+        client = clients.analytics_client(settings.GOOGLE_ANALYTICS_CREDENTIALS)
         
-        client = BetaAnalyticsDataClient(credentials=credentials)
+        # Busca a partir do último dia coletado (que pode ter ficado incompleto);
+        # na primeira coleta, os últimos COLLECTOR_INITIAL_DAYS dias
+        watermark = get_watermark('analytics')
+        if watermark:
+            start_date = timezone.localdate(watermark)
+        else:
+            start_date = timezone.localdate() - timedelta(days=settings.COLLECTOR_INITIAL_DAYS)
         
         # Configurar requisição
         request = RunReportRequest(
             property=f"properties/{settings.GOOGLE_ANALYTICS_PROPERTY_ID}",
-            date_ranges=[DateRange(start_date="7daysAgo", end_date="today")],
+            date_ranges=[DateRange(start_date=start_date.isoformat(), end_date="today")],
             metrics=[
                 Metric(name="screenPageViews"),
                 Metric(name="activeUsers"),
@@ -203,34 +262,110 @@ def fetch_analytics_metrics():
             dimensions=[Dimension(name="date")],
         )
         
-        response = client.run_report(request)
+        response = clients.call_with_retry(
+            client.run_report, request, timeout=settings.COLLECTOR_READ_TIMEOUT
+        )
         
-        # Processar resposta
+        # Processar resposta: uma linha por dia, datada do início do dia
+        metrics = []
         for row in response.rows:
-            date_value = row.dimension_values[0].value
+            date_value = datetime.strptime(row.dimension_values[0].value, '%Y%m%d').date()
             
-            WebsiteMetric.objects.create(
+            metrics.append(WebsiteMetric(
                 page_views=int(row.metric_values[0].value),
                 unique_visitors=int(row.metric_values[1].value),
                 sessions=int(row.metric_values[2].value),
                 bounce_rate=float(row.metric_values[3].value),
-                collected_at=timezone.now()
-            )
+                collected_at=timezone.make_aware(datetime.combine(date_value, time.min))
+            ))
         
-        print("Google Analytics metrics coletadas")
+        if not metrics:
+            print("Google Analytics sem dados novos")
+            return 0
+        
+        watermark = max(metric.collected_at for metric in metrics)
+        rows_written = save_collected('analytics', WebsiteMetric, metrics, watermark)
+        
+        print(f"Google Analytics metrics coletadas: {rows_written} dias gravados")
+        return rows_written
     
     except Exception as e:
         print(f"Erro ao coletar métricas do Google Analytics: {str(e)}")
+        raise
+    
+    return 0
+
+
+# Coletores disponíveis para uma rodada de coleta
+COLLECTORS = {
+    'twitter': fetch_twitter_metrics,
+    'youtube': fetch_youtube_metrics,
+    'app_store': fetch_app_store_metrics,
+    'google_play': fetch_google_play_metrics,
+    'analytics': fetch_analytics_metrics,
+}
+
+
+@shared_task
+def collect_metrics(sources=None):
+    """
+    Dispara os coletores em paralelo (chord) e registra o resultado da rodada.
+    
+    Cada coletor roda em seu próprio worker; a rodada termina no tempo do
+    coletor mais lento, limitado por COLLECTOR_TIME_LIMIT.
+    """
+    sources = sources or list(COLLECTORS)
+    header = [COLLECTORS[source].s() for source in sources]
+    result = chord(header)(collection_finished.s(sources))
+    return result.id
+
+
+@shared_task
+def collection_finished(results, sources):
+    """Callback da rodada de coleta"""
+    
+    summary = ', '.join(f"{source}: {rows or 0}" for source, rows in zip(sources, results))
+    print(f"Coleta concluída ({summary})")
+    return dict(zip(sources, results))
+
+
+@shared_task
+def ensure_metric_partitions():
+    """Cria com antecedência as partições mensais das tabelas de métricas"""
+    
+    created = []
+    for model in METRIC_SOURCES.values():
+        created += partitions.ensure_partitions(model)
+    
+    print(f"Partições criadas: {', '.join(created) or 'nenhuma'}")
+    return created
 
 
 @shared_task
 def cleanup_old_metrics():
-    """Remove métricas antigas (manter apenas últimos 2 anos)"""
+    """
+    Remove métricas antigas (mais de METRIC_RETENTION_DAYS dias).
+    
+    No PostgreSQL os meses inteiros saem por DROP de partição; o restante é
+    apagado em lotes pequenos, sem um DELETE longo segurando locks.
+    """
+    
+    cutoff_date = timezone.now() - timedelta(days=settings.METRIC_RETENTION_DAYS)
+    
+    summary = []
+    for source, model in METRIC_SOURCES.items():
+        dropped, deleted = partitions.purge(model, cutoff_date)
+        summary.append(f"{source}: {len(dropped)} partições, {deleted} linhas")
     
-    cutoff_date = timezone.now() - timedelta(days=730)
+    deleted_anomalies, _ = MetricAnomaly.objects.filter(collected_at__lt=cutoff_date).delete()
+    if deleted_anomalies:
+        cache.invalidate('anomalies')
+    summary.append(f"anomalias: {deleted_anomalies}")
     
-    deleted_social = SocialMetric.objects.filter(collected_at__lt=cutoff_date).delete()
-    deleted_apps = AppDownload.objects.filter(collected_at__lt=cutoff_date).delete()
-    deleted_website = WebsiteMetric.objects.filter(collected_at__lt=cutoff_date).delete()
+    runs_cutoff = timezone.now() - timedelta(days=settings.COLLECTOR_RUN_RETENTION_DAYS)
+    deleted_runs, _ = CollectorRun.objects.filter(started_at__lt=runs_cutoff).delete()
+    if deleted_runs:
+        cache.invalidate('runs')
+    summary.append(f"execuções de coletores: {deleted_runs}")
     
-    print(f"Limpeza concluída: {deleted_social[0]} social, {deleted_apps[0]} apps, {deleted_website[0]} website")
+    print(f"Limpeza concluída: {'; '.join(summary)}")
@@ -5,6 +5,8 @@ from .views import (
     AppDownloadViewSet,
     WebsiteMetricViewSet,
     ManualEntryViewSet,
+    CollectorRunViewSet,
+    MetricAnomalyViewSet,
     DashboardViewSet
 )
 
@@ -13,6 +15,8 @@ router.register(r'social-metrics', SocialMetricViewSet, basename='social-metric'
 router.register(r'app-downloads', AppDownloadViewSet, basename='app-download')
 router.register(r'website-metrics', WebsiteMetricViewSet, basename='website-metric')
 router.register(r'manual-entries', ManualEntryViewSet, basename='manual-entry')
+router.register(r'collector-runs', CollectorRunViewSet, basename='collector-run')
+router.register(r'anomalies', MetricAnomalyViewSet, basename='anomaly')
 router.register(r'dashboard', DashboardViewSet, basename='dashboard')
 
 urlpatterns = [
@@ -1,24 +1,450 @@
+import json
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Max, Q
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Avg, Count, Max, Sum, Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.http import http_date
 from datetime import timedelta, datetime
-from .models import SocialMetric, AppDownload, WebsiteMetric, ManualEntry
+from . import analytics, cache, export, forecast, imports, rollups, snapshots
+from .cache import cached_response
+from .ingest import ingest, reserve_batch, settle_batch
+from .pagination import KeysetPagination
+from .parsers import NDJSONParser
+from .series import AGGREGATES, BUCKETS, LTTB_MIN_POINTS, bucketed, downsample
+from .models import SocialMetric, AppDownload, WebsiteMetric, ManualEntry, CollectorRun, MetricAnomaly
 from .serializers import (
+    model_columns, requested_fields, ValuesSerializer,
     SocialMetricSerializer, AppDownloadSerializer,
     WebsiteMetricSerializer, ManualEntrySerializer,
-    DashboardSummarySerializer
+    CollectorRunSerializer, MetricAnomalySerializer, DashboardSummarySerializer
 )
 
 
-class SocialMetricViewSet(viewsets.ModelViewSet):
+PERIOD_DELTAS = {
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+    'month': timedelta(days=30),
+    'year': timedelta(days=365),
+}
+
+
+def period_start(period):
+    """Início do período (day, week, month, year) ou None se desconhecido"""
+    delta = PERIOD_DELTAS.get(period)
+    if delta is None:
+        return None
+    return timezone.now() - delta
+
+
+def comparison_windows(periods):
+    """
+    Janelas atual e anterior ('<period>:current', '<period>:previous') de
+    cada período, em horas cheias até o fim da hora corrente.
+    """
+    end = rollups.bucket_end(rollups.bucket_start(timezone.now(), 'hour'), 'hour')
+    windows = {}
+    for period in periods:
+        delta = PERIOD_DELTAS[period]
+        windows[f'{period}:current'] = (end - delta, end)
+        windows[f'{period}:previous'] = (end - 2 * delta, end - delta)
+    return windows
+
+
+class TimeSeriesMixin:
+    """Action `series`: métricas agrupadas por hora/dia/semana para gráficos"""
+    
+    # Campos numéricos permitidos; o primeiro é o padrão
+    series_fields = []
+    cache_sources = ()
+    
+    @action(detail=False, methods=['get'])
+    @cached_response()
+    def series(self, request):
+        """
+        Série agregada no banco, respeitando os filtros da listagem.
+        
+        Parâmetros: bucket (hour, day, week), agg (avg, sum, min, max),
+        fields (lista separada por vírgula) e max_points (redução via LTTB).
+        """
+        bucket = request.query_params.get('bucket', 'day')
+        agg = request.query_params.get('agg', 'avg')
+        fields = request.query_params.get('fields')
+        fields = fields.split(',') if fields else self.series_fields[:1]
+        
+        if bucket not in BUCKETS:
+            return Response(
+                {'error': f"bucket must be one of: {', '.join(BUCKETS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if agg not in AGGREGATES:
+            return Response(
+                {'error': f"agg must be one of: {', '.join(AGGREGATES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        invalid = [field for field in fields if field not in self.series_fields]
+        if invalid:
+            return Response(
+                {'error': f"Invalid fields: {', '.join(invalid)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            max_points = int(request.query_params.get('max_points', 0)) or None
+        except ValueError:
+            return Response(
+                {'error': 'max_points must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if max_points is not None and max_points < LTTB_MIN_POINTS:
+            return Response(
+                {'error': f'max_points must be at least {LTTB_MIN_POINTS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        result = []
+        for platform, points in bucketed(self.get_queryset(), fields, bucket, agg).items():
+            points = downsample(points, max_points, fields[0])
+            result.append({
+                'platform': platform,
+                'points': [{'bucket': start, **values} for start, values in points],
+            })
+        
+        return Response({
+            'bucket': bucket,
+            'agg': agg,
+            'fields': fields,
+            'series': result,
+        })
+
+
+class GrowthMixin:
+    """
+    Actions `growth` (variação diária, crescimento e médias móveis de 7 e 30
+    dias) e `forecast` (projeção dos campos de nível).
+    """
+    
+    @action(detail=False, methods=['get'])
+    @cached_response()
+    def growth(self, request):
+        """
+        Indicadores diários por plataforma a partir do último valor de cada dia.
+        
+        Parâmetros: field (padrão: o primeiro de series_fields), period
+        (day, week, month, year; sem período usa todo o histórico) e platform.
+        """
+        field = request.query_params.get('field', self.series_fields[0])
+        period = request.query_params.get('period')
+        
+        if field not in self.series_fields:
+            return Response(
+                {'error': f'Invalid field: {field}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if period and period not in PERIOD_DELTAS:
+            return Response(
+                {'error': f"period must be one of: {', '.join(PERIOD_DELTAS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            'field': field,
+            'period': period,
+            'moving_average_windows': list(analytics.MOVING_AVERAGE_WINDOWS),
+            'platforms': analytics.growth_by_platform(
+                self.queryset.model,
+                field,
+                start=period_start(period),
+                platform=request.query_params.get('platform'),
+            ),
+        })
+    
+    @action(detail=False, methods=['get'])
+    @cached_response()
+    def forecast(self, request):
+        """
+        Projeção diária por plataforma, com intervalo de 95%.
+        
+        Parâmetros: field (campo de nível; padrão: o primeiro de LEVEL_FIELDS),
+        method (linear ou holt, padrão holt), horizon (dias à frente, padrão
+        30), history (dias usados no ajuste, padrão 90), target (valor cuja
+        data de alcance é estimada) e platform.
+        """
+        model = self.queryset.model
+        field = request.query_params.get('field', model.LEVEL_FIELDS[0])
+        method = request.query_params.get('method', 'holt')
+        
+        if field not in model.LEVEL_FIELDS:
+            return Response(
+                {'error': f'Invalid field: {field}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if method not in forecast.METHODS:
+            return Response(
+                {'error': f"method must be one of: {', '.join(forecast.METHODS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            horizon = int(request.query_params.get('horizon', 30))
+            history = int(request.query_params.get('history', 90))
+        except ValueError:
+            return Response(
+                {'error': 'horizon and history must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not 1 <= horizon <= 365 or not 7 <= history <= 730:
+            return Response(
+                {'error': 'horizon must be between 1 and 365 and history between 7 and 730'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        target = request.query_params.get('target')
+        try:
+            target = float(target) if target else None
+        except ValueError:
+            return Response(
+                {'error': 'target must be a number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            'field': field,
+            'method': method,
+            'horizon': horizon,
+            'history': history,
+            'target': target,
+            'platforms': forecast.forecast_by_platform(
+                model,
+                field,
+                method,
+                horizon,
+                history,
+                platform=request.query_params.get('platform'),
+                target=target,
+            ),
+        })
+
+
+class ExportMixin:
+    """Action `export`: histórico completo em CSV, NDJSON ou Parquet, em streaming"""
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exporta as linhas com os mesmos filtros da listagem (platform,
+        period, start_date/end_date), sem paginação.
+        
+        Parâmetro file_format: csv (padrão), ndjson ou parquet (`format` já é
+        usado pelo DRF para escolher o renderer).
+        """
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in export.FORMATS:
+            return Response(
+                {'error': f"file_format must be one of: {', '.join(export.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        content_type, extension = export.FORMATS[file_format]
+        chunks = export.stream(self.filter_queryset(self.get_queryset()), file_format)
+        if isinstance(request._request, ASGIRequest):
+            chunks = export.async_stream(chunks)
+        
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        filename = f"{self.basename}-{timezone.localtime():%Y%m%d-%H%M}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    GETs condicionais (If-None-Match / If-Modified-Since) em todas as
+    actions de leitura.
+
+    Os validadores vêm das gerações das fontes em `cache_sources`; quando
+    ainda valem, a resposta é 304 sem executar consultas, agregações ou
+    serialização.
+    """
+    
+    cache_sources = ()
+    _validators = None
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD') and self.cache_sources:
+            self._validators = cache.validators(request, self.cache_sources)
+            if cache.not_modified(request, *self._validators):
+                raise cache.NotModified
+    
+    def handle_exception(self, exc):
+        if isinstance(exc, cache.NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self._validators and response.status_code in (200, 304):
+            etag, last_modified = self._validators
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # O navegador guarda a resposta, mas sempre a revalida
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class NaturalKeyMixin:
+    """Gravações que repetem a chave natural (NATURAL_KEY) de uma linha existente respondem 409"""
+    
+    def handle_exception(self, exc):
+        if isinstance(exc, IntegrityError):
+            fields = ', '.join(self.queryset.model.NATURAL_KEY)
+            return Response(
+                {'error': f'A row with the same ({fields}) already exists'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return super().handle_exception(exc)
+
+
+class BulkIngestMixin:
+    """Action `batch`: grava um lote de linhas (array JSON ou NDJSON) de uma vez"""
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def batch(self, request):
+        """
+        Valida e insere o lote inteiro em uma transação.
+        
+        O header Idempotency-Key evita que um envio repetido duplique linhas.
+        """
+        rows = request.data
+        if isinstance(rows, dict):
+            rows = rows.get('rows')
+        
+        if not isinstance(rows, list):
+            return Response(
+                {'error': 'Expected a JSON array, {"rows": [...]} or NDJSON body'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(rows) > settings.BULK_INGEST_MAX_ROWS:
+            return Response(
+                {'error': f'Batch exceeds {settings.BULK_INGEST_MAX_ROWS} rows'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = self.get_serializer(data=rows, many=True)
+        if not serializer.is_valid():
+            errors = [
+                {'row': index, 'errors': row_errors}
+                for index, row_errors in enumerate(serializer.errors)
+                if row_errors
+            ]
+            return Response(
+                {'error': 'Invalid rows', 'rows': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        model = self.queryset.model
+        objs = [model(**attrs) for attrs in serializer.validated_data]
+        created, duplicate = ingest(model, objs, key=request.headers.get('Idempotency-Key'))
+        
+        return Response(
+            {'created': created, 'duplicate': duplicate},
+            status=status.HTTP_200_OK if duplicate else status.HTTP_201_CREATED
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    Listagem com paginação por cursor em (collected_at, id).
+    
+    Ativada com ?pagination=cursor (ou ao seguir um link com ?cursor=);
+    sem o parâmetro, mantém a paginação por número de página.
+    """
+    
+    @property
+    def paginator(self):
+        params = self.request.query_params
+        if not hasattr(self, '_paginator') and (
+            params.get('pagination') == 'cursor' or 'cursor' in params
+        ):
+            self._paginator = KeysetPagination()
+        return super().paginator
+
+
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets nas leituras: com ?fields=a,b o serializer só inclui
+    esses campos e a consulta só lê as colunas correspondentes.
+    """
+    
+    sparse_actions = ('list', 'retrieve', 'latest')
+    
+    def sparse_fields(self):
+        """Campos pedidos em ?fields= (None: todos)"""
+        raw = self.request.query_params.get('fields')
+        if not raw or self.action not in self.sparse_actions:
+            return None
+        return requested_fields(self.get_serializer_class(), raw)
+    
+    def sparse_columns(self):
+        """Colunas lidas do banco para os campos pedidos (None: todas)"""
+        fields = self.sparse_fields()
+        if fields is None:
+            return None
+        # collected_at e id ordenam a listagem e a paginação por cursor
+        return [*model_columns(self.get_serializer_class(), fields), 'collected_at']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        columns = self.sparse_columns()
+        return queryset.only(*columns) if columns else queryset
+    
+    def get_serializer(self, *args, **kwargs):
+        fields = self.sparse_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+
+class ValuesListMixin:
+    """
+    Listagem lida com .values() e serializada por ValuesSerializer, sem criar
+    instâncias do modelo; o JSON é o mesmo do ModelSerializer.
+    """
+    
+    def list(self, request, *args, **kwargs):
+        rows = ValuesSerializer(self.get_serializer_class(), self.sparse_fields())
+        # collected_at e id também posicionam a paginação por cursor
+        columns = list(dict.fromkeys([*rows.columns, 'collected_at', 'id']))
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.to_representation(page))
+        
+        return Response(rows.to_representation(queryset))
+
+
+class SocialMetricViewSet(ConditionalGetMixin, SparseFieldsetMixin, ValuesListMixin, TimeSeriesMixin, ExportMixin, GrowthMixin, NaturalKeyMixin, BulkIngestMixin, KeysetPaginationMixin, viewsets.ModelViewSet):
     """ViewSet para métricas de redes sociais"""
     
     queryset = SocialMetric.objects.all()
     serializer_class = SocialMetricSerializer
     permission_classes = [IsAuthenticated]
+    series_fields = SocialMetric.ROLLUP_FIELDS
+    cache_sources = ('social',)
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -46,38 +472,26 @@ class SocialMetricViewSet(viewsets.ModelViewSet):
         return queryset
     
     def _filter_by_period(self, queryset, period):
-        now = timezone.now()
+        start_date = period_start(period)
         
-        if period == 'day':
-            start_date = now - timedelta(days=1)
-        elif period == 'week':
-            start_date = now - timedelta(weeks=1)
-        elif period == 'month':
-            start_date = now - timedelta(days=30)
-        elif period == 'year':
-            start_date = now - timedelta(days=365)
-        else:
+        if start_date is None:
             return queryset
         
         return queryset.filter(collected_at__gte=start_date)
     
     @action(detail=False, methods=['get'])
+    @cached_response('social')
     def latest(self, request):
         """Retorna as métricas mais recentes de cada plataforma"""
-        platforms = ['twitter', 'facebook', 'instagram', 'youtube', 'threads']
-        latest_metrics = []
-        
-        for platform in platforms:
-            metric = self.queryset.filter(platform=platform).first()
-            if metric:
-                latest_metrics.append(metric)
+        latest_metrics = snapshots.latest(SocialMetric, self.sparse_columns())
         
         serializer = self.get_serializer(latest_metrics, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cached_response('social')
     def comparison(self, request):
-        """Compara métricas entre diferentes períodos"""
+        """Compara a média de seguidores de uma plataforma com o período anterior"""
         platform = request.query_params.get('platform')
         period = request.query_params.get('period', 'week')
         
@@ -87,45 +501,15 @@ class SocialMetricViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        now = timezone.now()
+        if period not in PERIOD_DELTAS:
+            period = 'year'
         
-        # Define períodos
-        if period == 'day':
-            current_start = now - timedelta(days=1)
-            previous_start = now - timedelta(days=2)
-            previous_end = now - timedelta(days=1)
-        elif period == 'week':
-            current_start = now - timedelta(weeks=1)
-            previous_start = now - timedelta(weeks=2)
-            previous_end = now - timedelta(weeks=1)
-        elif period == 'month':
-            current_start = now - timedelta(days=30)
-            previous_start = now - timedelta(days=60)
-            previous_end = now - timedelta(days=30)
-        else:
-            current_start = now - timedelta(days=365)
-            previous_start = now - timedelta(days=730)
-            previous_end = now - timedelta(days=365)
-        
-        # Busca dados
-        current_metrics = self.queryset.filter(
-            platform=platform,
-            collected_at__gte=current_start
-        )
+        windows = rollups.compare(
+            SocialMetric, ['followers'], comparison_windows([period]), platform=platform
+        ).get(platform, {})
         
-        previous_metrics = self.queryset.filter(
-            platform=platform,
-            collected_at__range=[previous_start, previous_end]
-        )
-        
-        # Calcula médias
-        current_avg = current_metrics.aggregate(
-            avg_followers=Sum('followers')
-        )
-        
-        previous_avg = previous_metrics.aggregate(
-            avg_followers=Sum('followers')
-        )
+        current_avg = {'avg_followers': self._window_stat(windows, f'{period}:current', 'followers')}
+        previous_avg = {'avg_followers': self._window_stat(windows, f'{period}:previous', 'followers')}
         
         return Response({
             'platform': platform,
@@ -138,18 +522,90 @@ class SocialMetricViewSet(viewsets.ModelViewSet):
             )
         })
     
+    @action(detail=False, methods=['get'])
+    @cached_response('social')
+    def trends(self, request):
+        """
+        Atual x anterior de todas as plataformas em vários períodos, numa
+        única consulta aos agregados.
+        
+        Parâmetros: periods (lista separada por vírgula, padrão todos),
+        fields (padrão followers) e platform (opcional).
+        
+        O crescimento dos campos de nível (LEVEL_FIELDS, como seguidores)
+        compara o último valor de cada janela; o dos demais, a média.
+        """
+        periods = request.query_params.get('periods')
+        periods = periods.split(',') if periods else list(PERIOD_DELTAS)
+        fields = request.query_params.get('fields')
+        fields = fields.split(',') if fields else self.series_fields[:1]
+        
+        invalid = [period for period in periods if period not in PERIOD_DELTAS]
+        if invalid:
+            return Response(
+                {'error': f"Invalid periods: {', '.join(invalid)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        invalid = [field for field in fields if field not in self.series_fields]
+        if invalid:
+            return Response(
+                {'error': f"Invalid fields: {', '.join(invalid)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        stats = rollups.compare(
+            SocialMetric,
+            fields,
+            comparison_windows(periods),
+            platform=request.query_params.get('platform'),
+        )
+        
+        growth_stats = {
+            field: 'last' if field in SocialMetric.LEVEL_FIELDS else 'avg'
+            for field in fields
+        }
+        
+        results = []
+        for platform, windows in sorted(stats.items()):
+            trend = {}
+            for period in periods:
+                current = windows[f'{period}:current']
+                previous = windows[f'{period}:previous']
+                trend[period] = {
+                    'current': current,
+                    'previous': previous,
+                    'growth': {
+                        field: self._calculate_growth(current[field][stat], previous[field][stat])
+                        for field, stat in growth_stats.items()
+                    },
+                }
+            results.append({'platform': platform, 'periods': trend})
+        
+        return Response({
+            'periods': periods,
+            'fields': fields,
+            'results': results,
+        })
+    
+    def _window_stat(self, windows, name, field, stat='avg'):
+        return windows.get(name, {}).get(field, {}).get(stat)
+    
     def _calculate_growth(self, current, previous):
-        if previous == 0:
+        # Períodos sem dados chegam como None
+        if not previous:
             return 0
-        return ((current - previous) / previous) * 100
+        return (((current or 0) - previous) / previous) * 100
 
 
-class AppDownloadViewSet(viewsets.ModelViewSet):
+class AppDownloadViewSet(ConditionalGetMixin, SparseFieldsetMixin, ValuesListMixin, TimeSeriesMixin, ExportMixin, GrowthMixin, NaturalKeyMixin, BulkIngestMixin, KeysetPaginationMixin, viewsets.ModelViewSet):
     """ViewSet para métricas de downloads de apps"""
     
     queryset = AppDownload.objects.all()
     serializer_class = AppDownloadSerializer
     permission_classes = [IsAuthenticated]
+    series_fields = AppDownload.ROLLUP_FIELDS
+    cache_sources = ('app',)
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -166,31 +622,20 @@ class AppDownloadViewSet(viewsets.ModelViewSet):
         return queryset
     
     def _filter_by_period(self, queryset, period):
-        now = timezone.now()
+        start_date = period_start(period)
         
-        if period == 'day':
-            start_date = now - timedelta(days=1)
-        elif period == 'week':
-            start_date = now - timedelta(weeks=1)
-        elif period == 'month':
-            start_date = now - timedelta(days=30)
-        elif period == 'year':
-            start_date = now - timedelta(days=365)
-        else:
+        if start_date is None:
             return queryset
         
         return queryset.filter(collected_at__gte=start_date)
     
     @action(detail=False, methods=['get'])
+    @cached_response('app')
     def total(self, request):
         """Retorna total de downloads de todas as plataformas"""
-        android_total = self.queryset.filter(platform='android').aggregate(
-            total=Max('total_downloads')
-        )['total'] or 0
-        
-        ios_total = self.queryset.filter(platform='ios').aggregate(
-            total=Max('total_downloads')
-        )['total'] or 0
+        latest = {d.platform: d.total_downloads for d in snapshots.latest(AppDownload, ['total_downloads'])}
+        android_total = latest.get('android', 0)
+        ios_total = latest.get('ios', 0)
         
         return Response({
             'android': android_total,
@@ -199,12 +644,14 @@ class AppDownloadViewSet(viewsets.ModelViewSet):
         })
 
 
-class WebsiteMetricViewSet(viewsets.ModelViewSet):
+class WebsiteMetricViewSet(ConditionalGetMixin, SparseFieldsetMixin, ValuesListMixin, TimeSeriesMixin, ExportMixin, NaturalKeyMixin, BulkIngestMixin, KeysetPaginationMixin, viewsets.ModelViewSet):
     """ViewSet para métricas do website"""
     
     queryset = WebsiteMetric.objects.all()
     serializer_class = WebsiteMetricSerializer
     permission_classes = [IsAuthenticated]
+    series_fields = WebsiteMetric.ROLLUP_FIELDS
+    cache_sources = ('website',)
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -216,106 +663,384 @@ class WebsiteMetricViewSet(viewsets.ModelViewSet):
         return queryset
     
     def _filter_by_period(self, queryset, period):
-        now = timezone.now()
+        start_date = period_start(period)
         
-        if period == 'day':
-            start_date = now - timedelta(days=1)
-        elif period == 'week':
-            start_date = now - timedelta(weeks=1)
-        elif period == 'month':
-            start_date = now - timedelta(days=30)
-        elif period == 'year':
-            start_date = now - timedelta(days=365)
-        else:
+        if start_date is None:
             return queryset
         
         return queryset.filter(collected_at__gte=start_date)
     
     @action(detail=False, methods=['get'])
+    @cached_response('website')
     def summary(self, request):
         """Retorna resumo das métricas do website"""
         period = request.query_params.get('period', 'month')
-        queryset = self._filter_by_period(self.queryset, period)
-        
-        summary = queryset.aggregate(
-            total_page_views=Sum('page_views'),
-            total_unique_visitors=Sum('unique_visitors'),
-            total_sessions=Sum('sessions')
+        totals = rollups.totals(
+            WebsiteMetric,
+            ['page_views', 'unique_visitors', 'sessions'],
+            start=period_start(period)
         )
         
-        return Response(summary)
+        return Response({
+            'total_page_views': totals['page_views'],
+            'total_unique_visitors': totals['unique_visitors'],
+            'total_sessions': totals['sessions'],
+        })
 
 
-class ManualEntryViewSet(viewsets.ModelViewSet):
+class ManualEntryViewSet(ConditionalGetMixin, SparseFieldsetMixin, TimeSeriesMixin, BulkIngestMixin, KeysetPaginationMixin, viewsets.ModelViewSet):
     """ViewSet para entradas manuais"""
     
     queryset = ManualEntry.objects.all()
     serializer_class = ManualEntrySerializer
     permission_classes = [IsAuthenticated]
+    series_fields = ['metric_value']
+    cache_sources = ('manual',)
     
     def get_queryset(self):
         queryset = super().get_queryset()
         platform = self.request.query_params.get('platform', None)
+        metric_name = self.request.query_params.get('metric_name', None)
+        period = self.request.query_params.get('period', None)
+        start_date = self.request.query_params.get('start_date', None)
+        end_date = self.request.query_params.get('end_date', None)
         
         if platform:
             queryset = queryset.filter(platform=platform)
         
+        if metric_name:
+            queryset = queryset.filter(metric_name=metric_name)
+        
+        if period:
+            queryset = self._filter_by_period(queryset, period)
+        
+        if start_date and end_date:
+            try:
+                start = datetime.fromisoformat(start_date)
+                end = datetime.fromisoformat(end_date)
+                queryset = queryset.filter(collected_at__range=[start, end])
+            except ValueError:
+                pass
+        
+        return queryset
+    
+    def _filter_by_period(self, queryset, period):
+        start_date = period_start(period)
+        
+        if start_date is None:
+            return queryset
+        
+        return queryset.filter(collected_at__gte=start_date)
+    
+    @action(detail=False, methods=['get'])
+    @cached_response()
+    def latest(self, request):
+        """Valor mais recente de cada (plataforma, métrica), em uma única consulta"""
+        queryset = self.get_queryset()
+        columns = self.sparse_columns()
+        if columns:
+            # Colunas do agrupamento e da ordenação da resposta
+            queryset = queryset.only(*columns, 'platform', 'metric_name')
+        
+        rows = snapshots.latest_per_group(queryset, partition=('platform', 'metric_name'))
+        order = {value: index for index, (value, _) in enumerate(ManualEntry.PLATFORM_CHOICES)}
+        rows = sorted(rows, key=lambda row: (order.get(row.platform, len(order)), row.metric_name))
+        
+        serializer = self.get_serializer(rows, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """
+        Série de uma métrica manual (metric_name obrigatório), por plataforma.
+        
+        Mesmos parâmetros da série das métricas coletadas; o campo é
+        metric_value.
+        """
+        if not request.query_params.get('metric_name'):
+            return Response(
+                {'error': 'metric_name is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return super().series(request)
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        """
+        Importa um CSV (campo `file`, multipart) em blocos.
+        
+        `mapping` (JSON) liga platform, metric_name, metric_value,
+        collected_at e notes às colunas do arquivo (padrão: colunas de mesmo
+        nome); os campos `platform`, `metric_name` e `notes` do formulário
+        valem para as linhas sem a coluna. Linhas inválidas são ignoradas e
+        listadas no relatório. O header Idempotency-Key evita reimportar o
+        mesmo arquivo.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'file is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            mapping = json.loads(request.data.get('mapping') or '{}')
+        except ValueError:
+            mapping = None
+        if not isinstance(mapping, dict) or set(mapping) - set(imports.FIELDS):
+            return Response(
+                {'error': f"mapping must be a JSON object with keys among: {', '.join(imports.FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        key = request.headers.get('Idempotency-Key')
+        if key:
+            # Reservada antes da importação: um reenvio simultâneo é repetido
+            batch = reserve_batch(ManualEntry, key)
+            if batch is not None:
+                return Response({'created': batch.row_count, 'duplicate': True})
+        
+        defaults = {
+            field: request.data[field]
+            for field in ('platform', 'metric_name', 'notes')
+            if request.data.get(field)
+        }
+        entered_by = request.data.get('entered_by') or request.user.get_username()
+        
+        # Do chamador: continua com o total gravado mesmo se a importação falhar
+        report = imports.new_report()
+        try:
+            imports.import_csv(upload.file, mapping, defaults, entered_by, report)
+        except imports.InvalidFile as exc:
+            return Response(
+                {'error': str(exc), **report},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        finally:
+            if key:
+                # Os blocos já gravados contam, qualquer que seja o erro depois
+                settle_batch(ManualEntry, key, report['created'])
+        
+        if report['rows'] and not report['created']:
+            return Response(
+                {'error': 'Invalid rows', **report},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({**report, 'duplicate': False}, status=status.HTTP_201_CREATED)
+
+
+class CollectorRunViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """Execuções dos coletores (somente leitura)"""
+    
+    queryset = CollectorRun.objects.all()
+    serializer_class = CollectorRunSerializer
+    permission_classes = [IsAuthenticated]
+    cache_sources = ('runs',)
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        source = self.request.query_params.get('source', None)
+        run_status = self.request.query_params.get('status', None)
+        
+        if source:
+            queryset = queryset.filter(source=source)
+        if run_status:
+            queryset = queryset.filter(status=run_status)
+        
+        return queryset
+    
+    @action(detail=False, methods=['get'])
+    def freshness(self, request):
+        """
+        Retorna, por fonte, a última execução, o último sucesso e as durações
+        nos últimos `days` dias (padrão 7), das fontes mais lentas para as
+        mais rápidas.
+        """
+        try:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            return Response(
+                {'error': 'days must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        now = timezone.now()
+        stats = {
+            row['source']: row
+            for row in CollectorRun.objects.filter(started_at__gte=now - timedelta(days=days))
+            .values('source')
+            .annotate(
+                runs=Count('id'),
+                errors=Count('id', filter=Q(status='error')),
+                empty=Count('id', filter=Q(status='empty')),
+                rows_written=Sum('rows_written'),
+                avg_duration=Avg('duration_seconds'),
+                max_duration=Max('duration_seconds'),
+                avg_external=Avg('external_seconds'),
+                retries=Sum('retries'),
+            )
+            .order_by()
+        }
+        last_runs = {
+            run.source: run
+            for run in snapshots.latest_per_group(CollectorRun.objects.all(), ('source',), 'started_at')
+        }
+        last_success = dict(
+            CollectorRun.objects.filter(status='success')
+            .values_list('source')
+            .annotate(finished=Max('finished_at'))
+            .order_by()
+        )
+        
+        result = []
+        for source, label in CollectorRun.SOURCE_CHOICES:
+            last_run = last_runs.get(source)
+            success_at = last_success.get(source)
+            result.append({
+                'source': source,
+                'source_display': label,
+                'last_run_at': last_run.started_at if last_run else None,
+                'last_status': last_run.status if last_run else None,
+                'last_error_class': last_run.error_class if last_run else '',
+                'last_success_at': success_at,
+                'seconds_since_success': (now - success_at).total_seconds() if success_at else None,
+                'runs': 0,
+                'errors': 0,
+                'empty': 0,
+                'rows_written': 0,
+                'avg_duration': None,
+                'max_duration': None,
+                'avg_external': None,
+                'retries': 0,
+                **{key: value for key, value in stats.get(source, {}).items() if key != 'source'},
+            })
+        
+        # Fontes mais lentas primeiro; sem execuções no fim
+        result.sort(key=lambda row: -(row['avg_duration'] or -1))
+        return Response(result)
+
+
+class MetricAnomalyViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """Anomalias detectadas na gravação das métricas (somente leitura)"""
+    
+    queryset = MetricAnomaly.objects.all()
+    serializer_class = MetricAnomalySerializer
+    permission_classes = [IsAuthenticated]
+    cache_sources = ('anomalies',)
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        for param in ('source', 'platform', 'field'):
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value})
+        
+        start = period_start(self.request.query_params.get('period'))
+        if start:
+            queryset = queryset.filter(collected_at__gte=start)
+        
         return queryset
 
 
-class DashboardViewSet(viewsets.ViewSet):
+class DashboardViewSet(ConditionalGetMixin, viewsets.ViewSet):
     """ViewSet para dados consolidados do dashboard"""
     
     permission_classes = [IsAuthenticated]
+    cache_sources = ('social', 'app', 'website')
+    
+    sections = ('social_metrics', 'app_downloads', 'website_metrics', 'totals')
     
     @action(detail=False, methods=['get'])
+    @cached_response('social', 'app', 'website')
     def summary(self, request):
-        """Retorna resumo completo do dashboard"""
+        """
+        Retorna resumo completo do dashboard.
+        
+        ?include= escolhe as seções (social_metrics, app_downloads,
+        website_metrics, totals; padrão: todas) e ?fields[<seção>]=a,b os
+        campos das linhas de cada seção. Seções não pedidas não são
+        consultadas nem serializadas.
+        """
         period = request.query_params.get('period', 'month')
+        include = request.query_params.get('include')
+        include = {name.strip() for name in include.split(',')} if include else set(self.sections)
         
-        # Métricas de redes sociais (mais recentes)
-        social_platforms = ['twitter', 'facebook', 'instagram', 'youtube', 'threads']
-        social_metrics = []
-        total_followers = 0
+        invalid = include - set(self.sections)
+        if invalid:
+            return Response(
+                {'error': f"Invalid sections: {', '.join(sorted(invalid))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        for platform in social_platforms:
-            metric = SocialMetric.objects.filter(platform=platform).first()
-            if metric:
-                social_metrics.append(metric)
-                total_followers += metric.followers
+        totals = 'totals' in include
+        data = {}
         
-        # Downloads de apps
-        android_downloads = AppDownload.objects.filter(platform='android').first()
-        ios_downloads = AppDownload.objects.filter(platform='ios').first()
+        # Métricas de redes sociais (mais recentes)
+        if 'social_metrics' in include or totals:
+            social_fields, social_columns = self._section_fields(
+                request, 'social_metrics', SocialMetricSerializer, include, 'followers'
+            )
+            social_metrics = snapshots.latest(SocialMetric, social_columns)
+            if 'social_metrics' in include:
+                data['social_metrics'] = SocialMetricSerializer(
+                    social_metrics, many=True, fields=social_fields
+                ).data
         
-        app_downloads = [d for d in [android_downloads, ios_downloads] if d]
-        total_app_downloads = sum([d.total_downloads for d in app_downloads])
+        # Downloads de apps
+        if 'app_downloads' in include or totals:
+            app_fields, app_columns = self._section_fields(
+                request, 'app_downloads', AppDownloadSerializer, include, 'total_downloads'
+            )
+            app_downloads = snapshots.latest(AppDownload, app_columns)
+            if 'app_downloads' in include:
+                data['app_downloads'] = AppDownloadSerializer(
+                    app_downloads, many=True, fields=app_fields
+                ).data
         
         # Métricas do website
-        now = timezone.now()
-        if period == 'day':
-            start_date = now - timedelta(days=1)
-        elif period == 'week':
-            start_date = now - timedelta(weeks=1)
-        elif period == 'year':
-            start_date = now - timedelta(days=365)
-        else:
-            start_date = now - timedelta(days=30)
-        
-        website_metrics = WebsiteMetric.objects.filter(
-            collected_at__gte=start_date
-        )
+        start_date = period_start(period) or period_start('month')
         
-        total_page_views = website_metrics.aggregate(
-            total=Sum('page_views')
-        )['total'] or 0
+        if 'website_metrics' in include:
+            website_fields, website_columns = self._section_fields(
+                request, 'website_metrics', WebsiteMetricSerializer, include
+            )
+            website_metrics = WebsiteMetric.objects.filter(
+                collected_at__gte=start_date
+            )
+            if website_columns is not None:
+                website_metrics = website_metrics.only(*website_columns)
+            data['website_metrics'] = WebsiteMetricSerializer(
+                website_metrics, many=True, fields=website_fields
+            ).data
         
-        return Response({
-            'social_metrics': SocialMetricSerializer(social_metrics, many=True).data,
-            'app_downloads': AppDownloadSerializer(app_downloads, many=True).data,
-            'website_metrics': WebsiteMetricSerializer(website_metrics, many=True).data,
-            'total_followers': total_followers,
-            'total_app_downloads': total_app_downloads,
-            'total_page_views': total_page_views,
-            'period': period
-        })
+        if totals:
+            data['total_followers'] = sum([m.followers for m in social_metrics])
+            data['total_app_downloads'] = sum([d.total_downloads for d in app_downloads])
+            data['total_page_views'] = rollups.totals(
+                WebsiteMetric, ['page_views'], start=start_date
+            )['page_views'] or 0
+        
+        data['period'] = period
+        return Response(data)
+    
+    def _section_fields(self, request, section, serializer_class, include, total_field=None):
+        """
+        Campos pedidos para as linhas da seção e colunas a ler do banco.
+        
+        Retorna (None, None) quando todos os campos são necessários. Se só os
+        totais precisam da seção, lê apenas `total_field`.
+        """
+        raw = request.query_params.get(f'fields[{section}]')
+        if section not in include:
+            return None, [total_field]
+        if not raw:
+            return None, None
+        
+        fields = requested_fields(serializer_class, raw)
+        columns = model_columns(serializer_class, fields)
+        if total_field and 'totals' in include and total_field not in columns:
+            columns.append(total_field)
+        return fields, columns
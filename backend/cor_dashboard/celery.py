@@ -15,26 +15,30 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 # Celery Beat Schedule
+# Cada entrada dispara uma rodada de coleta em paralelo (api.tasks.collect_metrics)
 app.conf.beat_schedule = {
-    'fetch-twitter-metrics-every-hour': {
-        'task': 'api.tasks.fetch_twitter_metrics',
+    'collect-hourly-metrics': {
+        'task': 'api.tasks.collect_metrics',
         'schedule': crontab(minute=0),  # A cada hora
+        'args': (['twitter', 'youtube'],),
     },
-    'fetch-youtube-metrics-every-hour': {
-        'task': 'api.tasks.fetch_youtube_metrics',
-        'schedule': crontab(minute=5),  # A cada hora, 5 min depois
-    },
-    'fetch-app-store-metrics-daily': {
-        'task': 'api.tasks.fetch_app_store_metrics',
+    'collect-daily-app-metrics': {
+        'task': 'api.tasks.collect_metrics',
         'schedule': crontab(hour=2, minute=0),  # 2h da manhã
+        'args': (['app_store', 'google_play'],),
     },
-    'fetch-google-play-metrics-daily': {
-        'task': 'api.tasks.fetch_google_play_metrics',
-        'schedule': crontab(hour=2, minute=30),  # 2:30h da manhã
-    },
-    'fetch-analytics-metrics-every-6-hours': {
-        'task': 'api.tasks.fetch_analytics_metrics',
+    'collect-analytics-metrics-every-6-hours': {
+        'task': 'api.tasks.collect_metrics',
         'schedule': crontab(minute=0, hour='*/6'),  # A cada 6 horas
+        'args': (['analytics'],),
+    },
+    'ensure-metric-partitions': {
+        'task': 'api.tasks.ensure_metric_partitions',
+        'schedule': crontab(hour=1, minute=0),  # Diariamente à 1h
+    },
+    'cleanup-old-metrics': {
+        'task': 'api.tasks.cleanup_old_metrics',
+        'schedule': crontab(hour=3, minute=30),  # Diariamente às 3h30
     },
 }
 
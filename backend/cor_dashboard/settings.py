@@ -5,6 +5,7 @@ Django settings for COR Social Dashboard project.
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -39,6 +40,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -80,9 +83,54 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='postgres'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Conexões persistentes (segundos; 0 fecha a cada requisição), verificadas
+        # antes de reutilizar
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        # True atrás do pgbouncer em pool_mode=transaction, onde cursores do lado
+        # do servidor (iterator()) não sobrevivem entre transações
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
     }
 }
 
+# Réplica de leitura opcional: leituras de requisições GET vão para ela
+# (api.routers); gravações e tarefas do Celery ficam no primário
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+# Segundos em que as leituras ficam no primário após uma gravação (atraso da réplica)
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+
+
+# Cache (Redis) - respostas do dashboard
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_URL', default='redis://localhost:6379/1'),
+        'KEY_PREFIX': 'cor_dashboard',
+    }
+}
+
+# Tempo máximo (segundos) de uma resposta em cache; gravações invalidam antes disso
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Atualizações ao vivo (/api/live/): deltas publicados num canal do Redis
+LIVE_UPDATES_ENABLED = config('LIVE_UPDATES_ENABLED', default=True, cast=bool)
+LIVE_REDIS_URL = config('LIVE_REDIS_URL', default='redis://localhost:6379/0')
+LIVE_CHANNEL = config('LIVE_CHANNEL', default='cor_dashboard:live')
+# Intervalo dos pings que mantêm a conexão aberta e espera do navegador antes de reconectar
+LIVE_HEARTBEAT_SECONDS = config('LIVE_HEARTBEAT_SECONDS', default=15, cast=int)
+LIVE_RETRY_MS = config('LIVE_RETRY_MS', default=3000, cast=int)
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -126,11 +174,31 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'api.renderers.ColumnarJSONRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 100,
 }
 
 
+# Ingestão em massa (endpoints batch/)
+BULK_INGEST_MAX_ROWS = config('BULK_INGEST_MAX_ROWS', default=100000, cast=int)
+BULK_INSERT_BATCH_SIZE = 1000
+# A partir deste tamanho, lotes no PostgreSQL são gravados com COPY
+BULK_COPY_THRESHOLD = config('BULK_COPY_THRESHOLD', default=5000, cast=int)
+
+# Importação de CSV das entradas manuais (manual-entries/import/): linhas
+# validadas e gravadas por bloco; erros além do limite só são contados
+MANUAL_IMPORT_BATCH_SIZE = config('MANUAL_IMPORT_BATCH_SIZE', default=5000, cast=int)
+MANUAL_IMPORT_MAX_ERRORS = config('MANUAL_IMPORT_MAX_ERRORS', default=1000, cast=int)
+
+# Exportação em streaming (endpoints export/): linhas lidas e enviadas por bloco
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=5000, cast=int)
+
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=5),
@@ -152,6 +220,16 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+CORS_ALLOW_HEADERS = (
+    *default_headers,
+    'idempotency-key',
+    'if-none-match',
+    'if-modified-since',
+)
+
+# Validadores dos GETs condicionais e nome do arquivo das exportações, lidos pelo frontend
+CORS_EXPOSE_HEADERS = ['etag', 'last-modified', 'content-disposition']
+
 
 # Celery Configuration
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
@@ -162,6 +240,44 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
 
+# Coletores (chamadas às APIs externas)
+COLLECTOR_CONNECT_TIMEOUT = config('COLLECTOR_CONNECT_TIMEOUT', default=5, cast=int)
+COLLECTOR_READ_TIMEOUT = config('COLLECTOR_READ_TIMEOUT', default=30, cast=int)
+COLLECTOR_MAX_RETRIES = config('COLLECTOR_MAX_RETRIES', default=3, cast=int)
+COLLECTOR_BACKOFF_BASE = config('COLLECTOR_BACKOFF_BASE', default=1.0, cast=float)
+COLLECTOR_BACKOFF_MAX = config('COLLECTOR_BACKOFF_MAX', default=30.0, cast=float)
+COLLECTOR_TIME_LIMIT = config('COLLECTOR_TIME_LIMIT', default=180, cast=int)
+# Dias buscados na primeira coleta de fontes com histórico (antes da marca d'água)
+COLLECTOR_INITIAL_DAYS = config('COLLECTOR_INITIAL_DAYS', default=7, cast=int)
+# Dias de histórico das execuções dos coletores (CollectorRun)
+COLLECTOR_RUN_RETENTION_DAYS = config('COLLECTOR_RUN_RETENTION_DAYS', default=90, cast=int)
+
+# Métricas do Prometheus (/metrics); com METRICS_TOKEN a coleta exige
+# o header "Authorization: Bearer <token>"
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Detecção de anomalias na gravação: EWMA por (fonte, plataforma, campo)
+ANOMALY_DETECTION_ENABLED = config('ANOMALY_DETECTION_ENABLED', default=True, cast=bool)
+# Peso de cada coleta nova na média/variância (0.05 ≈ memória de ~20 coletas)
+ANOMALY_ALPHA = config('ANOMALY_ALPHA', default=0.05, cast=float)
+# Desvios padrão a partir dos quais um valor é anômalo
+ANOMALY_THRESHOLD = config('ANOMALY_THRESHOLD', default=5.0, cast=float)
+# Coletas necessárias antes de começar a sinalizar
+ANOMALY_MIN_SAMPLES = config('ANOMALY_MIN_SAMPLES', default=24, cast=int)
+# Desvio mínimo, relativo ao valor esperado, para sinalizar (ignora séries quase constantes)
+ANOMALY_MIN_RELATIVE_DEVIATION = config('ANOMALY_MIN_RELATIVE_DEVIATION', default=0.001, cast=float)
+
+# Validade máxima dos parâmetros de projeção no cache (segundos); qualquer
+# gravação nova da fonte já força um novo ajuste
+FORECAST_CACHE_TIMEOUT = config('FORECAST_CACHE_TIMEOUT', default=86400, cast=int)
+
+# Retenção e particionamento mensal das tabelas de métricas (PostgreSQL)
+METRIC_RETENTION_DAYS = config('METRIC_RETENTION_DAYS', default=730, cast=int)
+METRIC_PARTITION_MONTHS_AHEAD = config('METRIC_PARTITION_MONTHS_AHEAD', default=3, cast=int)
+METRIC_DELETE_BATCH_SIZE = config('METRIC_DELETE_BATCH_SIZE', default=5000, cast=int)
+
+
 # Social Media API Keys
 TWITTER_BEARER_TOKEN = config('TWITTER_BEARER_TOKEN', default='')
 TWITTER_API_KEY = config('TWITTER_API_KEY', default='')
@@ -3,6 +3,8 @@ URL configuration for cor_dashboard project.
 """
 from django.contrib import admin
 from django.urls import path, include
+from api.live import live_stream
+from api.metrics import metrics_view
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -12,5 +14,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/live/', live_stream, name='live'),
     path('api/', include('api.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
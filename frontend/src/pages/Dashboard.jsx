@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { toast } from 'react-toastify'
 import {
   Users,
@@ -11,6 +11,7 @@ import {
   Instagram,
   Youtube,
   RefreshCw,
+  ClipboardList,
 } from 'lucide-react'
 import {
   LineChart,
@@ -26,26 +27,175 @@ import {
 } from 'recharts'
 import dashboardService from '../services/dashboardService'
 
+// Granularidade da série de seguidores para cada período
+const seriesBuckets = {
+  day: 'hour',
+  week: 'hour',
+  month: 'day',
+  year: 'day',
+}
+
+const MAX_CHART_POINTS = 200
+
+const BUCKET_MS = {
+  hour: 60 * 60 * 1000,
+  day: 24 * 60 * 60 * 1000,
+}
+
+// Espera antes de recarregar por um evento que não traz o valor novo,
+// agrupando rajadas de gravações num único recarregamento
+const LIVE_REFETCH_DELAY = 2000
+
+// Converte a resposta de /series/ em linhas do Recharts: { bucket, twitter, youtube, ... }
+const toChartData = (series) => {
+  const rows = {}
+  const platforms = []
+
+  series.series.forEach(({ platform, points }) => {
+    platforms.push(platform)
+    points.forEach((point) => {
+      rows[point.bucket] = rows[point.bucket] || { bucket: point.bucket }
+      rows[point.bucket][platform] = Math.round(point.followers)
+    })
+  })
+
+  const data = Object.values(rows).sort((a, b) => new Date(a.bucket) - new Date(b.bucket))
+  return { data, platforms }
+}
+
+// Crescimento da média de seguidores sobre o período anterior, por plataforma
+const toGrowthByPlatform = (trends, period) =>
+  Object.fromEntries(
+    trends.results.map(({ platform, periods }) => [platform, periods[period].growth.followers])
+  )
+
+// Substitui a linha da plataforma se a recebida for mais recente
+const mergeLatest = (rows = [], row) => {
+  const current = rows.find((item) => item.platform === row.platform)
+  if (!current) return [...rows, row]
+  if (new Date(current.collected_at) > new Date(row.collected_at)) return rows
+  return rows.map((item) => (item.platform === row.platform ? row : item))
+}
+
+// Aplica ao resumo a linha nova de uma rede social ou loja de apps
+const applySummaryDelta = (summary, source, row) => {
+  if (!summary) return summary
+
+  if (source === 'social') {
+    const socialMetrics = mergeLatest(summary.social_metrics, row)
+    return {
+      ...summary,
+      social_metrics: socialMetrics,
+      total_followers: socialMetrics.reduce((total, metric) => total + metric.followers, 0),
+    }
+  }
+
+  const appDownloads = mergeLatest(summary.app_downloads, row)
+  return {
+    ...summary,
+    app_downloads: appDownloads,
+    total_app_downloads: appDownloads.reduce((total, app) => total + app.total_downloads, 0),
+  }
+}
+
+// Atualiza o último ponto da série ou abre um bucket novo, alinhado aos do servidor
+const applySeriesDelta = (series, row, bucket) => {
+  if (!series.data.length || !series.platforms.includes(row.platform)) return series
+
+  const last = series.data[series.data.length - 1]
+  const lastTime = new Date(last.bucket).getTime()
+  const rowTime = new Date(row.collected_at).getTime()
+  if (rowTime < lastTime) return series
+
+  const steps = Math.floor((rowTime - lastTime) / BUCKET_MS[bucket])
+  const data = steps === 0
+    ? [...series.data.slice(0, -1), { ...last, [row.platform]: row.followers }]
+    : [
+        ...series.data,
+        {
+          bucket: new Date(lastTime + steps * BUCKET_MS[bucket]).toISOString(),
+          [row.platform]: row.followers,
+        },
+      ]
+
+  return { ...series, data }
+}
+
+const platformColors = {
+  twitter: '#003DA5',
+  facebook: '#1877F2',
+  instagram: '#E1306C',
+  youtube: '#FF0000',
+  threads: '#000000',
+}
+
 const Dashboard = () => {
   const [loading, setLoading] = useState(true)
   const [period, setPeriod] = useState('month')
   const [summaryData, setSummaryData] = useState(null)
-  const [socialMetrics, setSocialMetrics] = useState([])
+  const [followersSeries, setFollowersSeries] = useState({ data: [], platforms: [] })
+  const [followersGrowth, setFollowersGrowth] = useState({})
+  const [manualLatest, setManualLatest] = useState([])
+
+  const periodRef = useRef(period)
+  const fetchDataRef = useRef(null)
+  const refetchTimer = useRef(null)
 
   useEffect(() => {
+    periodRef.current = period
     fetchData()
   }, [period])
 
+  // Deltas ao vivo: redes sociais e apps são aplicados direto; website,
+  // entradas manuais e remoções disparam um recarregamento agrupado.
+  useEffect(() => {
+    const scheduleRefetch = () => {
+      clearTimeout(refetchTimer.current)
+      refetchTimer.current = setTimeout(() => fetchDataRef.current(), LIVE_REFETCH_DELAY)
+    }
+
+    const unsubscribe = dashboardService.subscribeLive((event) => {
+      if (event.type !== 'metric' || !['social', 'app'].includes(event.source)) {
+        scheduleRefetch()
+        return
+      }
+
+      setSummaryData((summary) => applySummaryDelta(summary, event.source, event.row))
+      if (event.source === 'social') {
+        setFollowersSeries((series) =>
+          applySeriesDelta(series, event.row, seriesBuckets[periodRef.current])
+        )
+      }
+    })
+
+    return () => {
+      clearTimeout(refetchTimer.current)
+      unsubscribe()
+    }
+  }, [])
+
   const fetchData = async () => {
     setLoading(true)
     try {
-      const [summary, social] = await Promise.all([
-        dashboardService.getSummary(period),
-        dashboardService.getSocialMetrics({ period }),
+      const [summary, series, trends, manual] = await Promise.all([
+        // As linhas do website no período não são exibidas aqui
+        dashboardService.getSummary(period, { include: 'social_metrics,app_downloads,totals' }),
+        dashboardService.getSocialSeries({
+          period,
+          bucket: seriesBuckets[period],
+          fields: 'followers',
+          max_points: MAX_CHART_POINTS,
+        }),
+        dashboardService.getSocialTrends({ periods: period, fields: 'followers' }),
+        dashboardService.getLatestManualEntries({
+          fields: 'id,platform_display,metric_name,metric_value,collected_at',
+        }),
       ])
 
       setSummaryData(summary)
-      setSocialMetrics(social.results || social)
+      setFollowersSeries(toChartData(series))
+      setFollowersGrowth(toGrowthByPlatform(trends, period))
+      setManualLatest(manual)
     } catch (error) {
       console.error('Erro ao carregar dados:', error)
       toast.error('Erro ao carregar dados do dashboard')
@@ -54,6 +204,8 @@ const Dashboard = () => {
     }
   }
 
+  fetchDataRef.current = fetchData
+
   const getPlatformIcon = (platform) => {
     const icons = {
       twitter: Twitter,
@@ -191,7 +343,7 @@ const Dashboard = () => {
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6">
           {summaryData?.social_metrics?.map((metric) => (
             <div
-              key={metric.id}
+              key={metric.platform}
               className="bg-white rounded-xl shadow-md p-6 hover:shadow-lg transition-shadow"
             >
               <div className="flex items-center justify-between mb-4">
@@ -211,6 +363,22 @@ const Dashboard = () => {
                   <p className="text-2xl font-bold text-gray-800">
                     {formatNumber(metric.followers)}
                   </p>
+                  {followersGrowth[metric.platform] !== undefined && (
+                    <div
+                      className={`flex items-center text-sm mt-1 ${
+                        followersGrowth[metric.platform] >= 0 ? 'text-green-600' : 'text-red-600'
+                      }`}
+                    >
+                      {followersGrowth[metric.platform] >= 0 ? (
+                        <TrendingUp size={14} className="mr-1" />
+                      ) : (
+                        <TrendingDown size={14} className="mr-1" />
+                      )}
+                      <span>
+                        {followersGrowth[metric.platform].toFixed(1)}% vs. período anterior
+                      </span>
+                    </div>
+                  )}
                 </div>
 
                 {metric.engagement_rate && (
@@ -237,7 +405,7 @@ const Dashboard = () => {
         <div className="grid grid-cols-1 md:grid-cols-2 gap-6">
           {summaryData?.app_downloads?.map((app) => (
             <div
-              key={app.id}
+              key={app.platform}
               className="bg-white rounded-xl shadow-md p-6"
             >
               <div className="flex items-center justify-between mb-4">
@@ -280,17 +448,42 @@ const Dashboard = () => {
         </div>
       </div>
 
+      {/* Manual Entries */}
+      {manualLatest.length > 0 && (
+        <div>
+          <h2 className="text-2xl font-bold text-gray-800 mb-4">Métricas Manuais</h2>
+          <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6">
+            {manualLatest.map((entry) => (
+              <div key={entry.id} className="bg-white rounded-xl shadow-md p-6">
+                <div className="flex items-center justify-between mb-2">
+                  <h3 className="text-sm font-semibold text-gray-600 capitalize">
+                    {entry.platform_display} · {entry.metric_name}
+                  </h3>
+                  <ClipboardList size={20} className="text-gray-400" />
+                </div>
+                <p className="text-3xl font-bold text-gray-800">
+                  {formatNumber(entry.metric_value)}
+                </p>
+                <p className="text-gray-500 text-xs mt-2">
+                  {new Date(entry.collected_at).toLocaleDateString('pt-BR')}
+                </p>
+              </div>
+            ))}
+          </div>
+        </div>
+      )}
+
       {/* Charts */}
-      {socialMetrics.length > 0 && (
+      {followersSeries.data.length > 0 && (
         <div className="bg-white rounded-xl shadow-md p-6">
           <h2 className="text-2xl font-bold text-gray-800 mb-6">
             Evolução de Seguidores
           </h2>
           <ResponsiveContainer width="100%" height={400}>
-            <LineChart data={socialMetrics}>
+            <LineChart data={followersSeries.data}>
               <CartesianGrid strokeDasharray="3 3" />
               <XAxis
-                dataKey="collected_at"
+                dataKey="bucket"
                 tickFormatter={(value) => {
                   const date = new Date(value)
                   return date.toLocaleDateString('pt-BR', { day: '2-digit', month: '2-digit' })
@@ -304,13 +497,18 @@ const Dashboard = () => {
                 }}
               />
               <Legend />
-              <Line
-                type="monotone"
-                dataKey="followers"
-                stroke="#003DA5"
-                strokeWidth={2}
-                name="Seguidores"
-              />
+              {followersSeries.platforms.map((platform) => (
+                <Line
+                  key={platform}
+                  type="monotone"
+                  dataKey={platform}
+                  stroke={platformColors[platform] || '#6B7280'}
+                  strokeWidth={2}
+                  dot={false}
+                  connectNulls
+                  name={platform}
+                />
+              ))}
             </LineChart>
           </ResponsiveContainer>
         </div>
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import { toast } from 'react-toastify'
-import { Plus, Trash2, Edit2, Save, X } from 'lucide-react'
+import { Plus, Trash2, Edit2, Save, X, Upload } from 'lucide-react'
 import dashboardService from '../services/dashboardService'
 
 const ManualEntry = () => {
@@ -15,6 +15,10 @@ const ManualEntry = () => {
     notes: '',
     entered_by: '',
   })
+  const [showImport, setShowImport] = useState(false)
+  const [importFile, setImportFile] = useState(null)
+  const [importPlatform, setImportPlatform] = useState('')
+  const [importReport, setImportReport] = useState(null)
 
   useEffect(() => {
     fetchEntries()
@@ -98,6 +102,32 @@ const ManualEntry = () => {
     setShowForm(false)
   }
 
+  const handleImport = async (e) => {
+    e.preventDefault()
+    if (!importFile) {
+      return
+    }
+
+    setLoading(true)
+    try {
+      const report = await dashboardService.importManualEntries(importFile, {
+        platform: importPlatform,
+      })
+      setImportReport(report)
+      toast.success(`${report.created} entradas importadas, ${report.skipped} ignoradas`)
+      fetchEntries()
+    } catch (error) {
+      console.error('Erro ao importar CSV:', error)
+      const data = error.response?.data
+      if (data?.errors) {
+        setImportReport(data)
+      }
+      toast.error(data?.error ? `Erro ao importar CSV: ${data.error}` : 'Erro ao importar CSV')
+    } finally {
+      setLoading(false)
+    }
+  }
+
   const handleChange = (e) => {
     const { name, value } = e.target
     setFormData((prev) => ({
@@ -117,24 +147,105 @@ const ManualEntry = () => {
           </p>
         </div>
 
-        <button
-          onClick={() => setShowForm(!showForm)}
-          className="flex items-center space-x-2 px-4 py-2 bg-cor-blue text-white rounded-lg hover:bg-cor-light-blue transition-colors"
-        >
-          {showForm ? (
-            <>
-              <X size={20} />
-              <span>Cancelar</span>
-            </>
-          ) : (
-            <>
-              <Plus size={20} />
-              <span>Nova Entrada</span>
-            </>
-          )}
-        </button>
+        <div className="flex space-x-2">
+          <button
+            onClick={() => setShowImport(!showImport)}
+            className="flex items-center space-x-2 px-4 py-2 border border-cor-blue text-cor-blue rounded-lg hover:bg-gray-50 transition-colors"
+          >
+            <Upload size={20} />
+            <span>Importar CSV</span>
+          </button>
+
+          <button
+            onClick={() => setShowForm(!showForm)}
+            className="flex items-center space-x-2 px-4 py-2 bg-cor-blue text-white rounded-lg hover:bg-cor-light-blue transition-colors"
+          >
+            {showForm ? (
+              <>
+                <X size={20} />
+                <span>Cancelar</span>
+              </>
+            ) : (
+              <>
+                <Plus size={20} />
+                <span>Nova Entrada</span>
+              </>
+            )}
+          </button>
+        </div>
       </div>
 
+      {/* Import */}
+      {showImport && (
+        <div className="bg-white rounded-xl shadow-md p-6">
+          <h2 className="text-xl font-bold text-gray-800 mb-2">Importar CSV</h2>
+          <p className="text-sm text-gray-600 mb-4">
+            Colunas: platform, metric_name, metric_value, collected_at e notes (opcional).
+            Linhas inválidas são ignoradas e listadas abaixo.
+          </p>
+
+          <form onSubmit={handleImport} className="space-y-4">
+            <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
+              <div>
+                <label className="block text-sm font-medium text-gray-700 mb-2">
+                  Arquivo *
+                </label>
+                <input
+                  type="file"
+                  accept=".csv,text/csv"
+                  onChange={(e) => setImportFile(e.target.files[0] || null)}
+                  required
+                  className="w-full px-4 py-2 border border-gray-300 rounded-lg"
+                />
+              </div>
+
+              <div>
+                <label className="block text-sm font-medium text-gray-700 mb-2">
+                  Plataforma (linhas sem a coluna)
+                </label>
+                <select
+                  value={importPlatform}
+                  onChange={(e) => setImportPlatform(e.target.value)}
+                  className="w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-cor-blue focus:border-transparent outline-none"
+                >
+                  <option value="">Usar a coluna do arquivo</option>
+                  <option value="facebook">Facebook</option>
+                  <option value="instagram">Instagram</option>
+                  <option value="threads">Threads</option>
+                  <option value="other">Outro</option>
+                </select>
+              </div>
+            </div>
+
+            <div className="flex justify-end">
+              <button
+                type="submit"
+                disabled={loading || !importFile}
+                className="flex items-center space-x-2 px-6 py-2 bg-cor-blue text-white rounded-lg hover:bg-cor-light-blue transition-colors disabled:opacity-50"
+              >
+                <Upload size={18} />
+                <span>Importar</span>
+              </button>
+            </div>
+          </form>
+
+          {importReport?.errors?.length > 0 && (
+            <div className="mt-4 max-h-48 overflow-y-auto text-sm text-red-600 space-y-1">
+              {importReport.errors.map(({ row, errors }) => (
+                <p key={row}>
+                  Linha {row}: {Object.entries(errors)
+                    .map(([field, messages]) => `${field}: ${messages.join(' ')}`)
+                    .join('; ')}
+                </p>
+              ))}
+              {importReport.errors_truncated && (
+                <p>… e outras {importReport.skipped - importReport.errors.length} linhas</p>
+              )}
+            </div>
+          )}
+        </div>
+      )}
+
       {/* Form */}
       {showForm && (
         <div className="bg-white rounded-xl shadow-md p-6">
@@ -1,29 +1,79 @@
 import api from './api'
 
+const LIVE_RECONNECT_DELAY = 5000
+
+// Última resposta e ETag de cada URL; a API responde 304 sem corpo
+// quando os dados não mudaram desde a última busca
+const validated = new Map()
+
+const conditionalGet = async (url) => {
+  const cached = validated.get(url)
+  const response = await api.get(url, {
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  })
+
+  if (response.status === 304 && cached) return cached.data
+
+  const etag = response.headers.etag
+  if (etag) validated.set(url, { etag, data: response.data })
+  return response.data
+}
+
+const refreshAccessToken = async () => {
+  const refresh = localStorage.getItem('refresh_token')
+  if (!refresh) return
+  const response = await api.post('/api/token/refresh/', { refresh })
+  localStorage.setItem('token', response.data.access)
+}
+
 const dashboardService = {
   // Dashboard Summary
-  getSummary: async (period = 'month') => {
-    const response = await api.get(`/api/dashboard/summary/?period=${period}`)
-    return response.data
+  // include: seções do resumo (social_metrics, app_downloads, website_metrics, totals);
+  // sem include, todas
+  getSummary: async (period = 'month', params = {}) => {
+    const queryParams = new URLSearchParams({ period, ...params }).toString()
+    return conditionalGet(`/api/dashboard/summary/?${queryParams}`)
   },
 
   // Social Metrics
   getSocialMetrics: async (params = {}) => {
     const queryParams = new URLSearchParams(params).toString()
-    const response = await api.get(`/api/social-metrics/?${queryParams}`)
-    return response.data
+    return conditionalGet(`/api/social-metrics/?${queryParams}`)
+  },
+
+  // Série agregada por hora/dia/semana, reduzida a max_points (LTTB)
+  getSocialSeries: async (params = {}) => {
+    const queryParams = new URLSearchParams(params).toString()
+    return conditionalGet(`/api/social-metrics/series/?${queryParams}`)
   },
 
   getLatestSocialMetrics: async () => {
-    const response = await api.get('/api/social-metrics/latest/')
-    return response.data
+    return conditionalGet('/api/social-metrics/latest/')
   },
 
   getSocialComparison: async (platform, period = 'week') => {
-    const response = await api.get(
+    return conditionalGet(
       `/api/social-metrics/comparison/?platform=${platform}&period=${period}`
     )
-    return response.data
+  },
+
+  // Variação diária, crescimento e médias móveis de 7/30 dias (field, period, platform)
+  getSocialGrowth: async (params = {}) => {
+    const queryParams = new URLSearchParams(params).toString()
+    return conditionalGet(`/api/social-metrics/growth/?${queryParams}`)
+  },
+
+  // Projeção diária com intervalo de 95% (field, method, horizon, history, target, platform)
+  getSocialForecast: async (params = {}) => {
+    const queryParams = new URLSearchParams(params).toString()
+    return conditionalGet(`/api/social-metrics/forecast/?${queryParams}`)
+  },
+
+  // Atual x anterior de todas as plataformas (periods, fields, platform)
+  getSocialTrends: async (params = {}) => {
+    const queryParams = new URLSearchParams(params).toString()
+    return conditionalGet(`/api/social-metrics/trends/?${queryParams}`)
   },
 
   createSocialMetric: async (data) => {
@@ -34,13 +84,21 @@ const dashboardService = {
   // App Downloads
   getAppDownloads: async (params = {}) => {
     const queryParams = new URLSearchParams(params).toString()
-    const response = await api.get(`/api/app-downloads/?${queryParams}`)
-    return response.data
+    return conditionalGet(`/api/app-downloads/?${queryParams}`)
   },
 
   getTotalDownloads: async () => {
-    const response = await api.get('/api/app-downloads/total/')
-    return response.data
+    return conditionalGet('/api/app-downloads/total/')
+  },
+
+  getAppGrowth: async (params = {}) => {
+    const queryParams = new URLSearchParams(params).toString()
+    return conditionalGet(`/api/app-downloads/growth/?${queryParams}`)
+  },
+
+  getAppForecast: async (params = {}) => {
+    const queryParams = new URLSearchParams(params).toString()
+    return conditionalGet(`/api/app-downloads/forecast/?${queryParams}`)
   },
 
   createAppDownload: async (data) => {
@@ -51,13 +109,11 @@ const dashboardService = {
   // Website Metrics
   getWebsiteMetrics: async (params = {}) => {
     const queryParams = new URLSearchParams(params).toString()
-    const response = await api.get(`/api/website-metrics/?${queryParams}`)
-    return response.data
+    return conditionalGet(`/api/website-metrics/?${queryParams}`)
   },
 
   getWebsiteSummary: async (period = 'month') => {
-    const response = await api.get(`/api/website-metrics/summary/?period=${period}`)
-    return response.data
+    return conditionalGet(`/api/website-metrics/summary/?period=${period}`)
   },
 
   createWebsiteMetric: async (data) => {
@@ -65,11 +121,32 @@ const dashboardService = {
     return response.data
   },
 
+  // Histórico completo para download (resource: social-metrics, app-downloads
+  // ou website-metrics; params: file_format, platform, period...)
+  exportMetrics: async (resource, params = {}) => {
+    const queryParams = new URLSearchParams(params).toString()
+    const response = await api.get(`/api/${resource}/export/?${queryParams}`, {
+      responseType: 'blob',
+    })
+    return response.data
+  },
+
   // Manual Entries
   getManualEntries: async (params = {}) => {
     const queryParams = new URLSearchParams(params).toString()
-    const response = await api.get(`/api/manual-entries/?${queryParams}`)
-    return response.data
+    return conditionalGet(`/api/manual-entries/?${queryParams}`)
+  },
+
+  // Valor mais recente de cada (plataforma, métrica)
+  getLatestManualEntries: async (params = {}) => {
+    const queryParams = new URLSearchParams(params).toString()
+    return conditionalGet(`/api/manual-entries/latest/?${queryParams}`)
+  },
+
+  // Série de uma métrica manual; params: { metric_name, bucket, agg, period, max_points }
+  getManualSeries: async (params = {}) => {
+    const queryParams = new URLSearchParams(params).toString()
+    return conditionalGet(`/api/manual-entries/series/?${queryParams}`)
   },
 
   createManualEntry: async (data) => {
@@ -86,6 +163,70 @@ const dashboardService = {
     const response = await api.delete(`/api/manual-entries/${id}/`)
     return response.data
   },
+
+  // Importa um CSV de entradas manuais. options: { mapping, platform,
+  // metric_name, notes, entered_by }; mapping liga cada campo a uma coluna
+  // do arquivo. Retorna o relatório { rows, created, skipped, errors }.
+  importManualEntries: async (file, options = {}) => {
+    const { mapping, ...fields } = options
+    const formData = new FormData()
+    formData.append('file', file)
+    if (mapping) {
+      formData.append('mapping', JSON.stringify(mapping))
+    }
+    Object.entries(fields).forEach(([name, value]) => {
+      if (value) {
+        formData.append(name, value)
+      }
+    })
+    const response = await api.post('/api/manual-entries/import/', formData)
+    return response.data
+  },
+
+  // Atualizações ao vivo (SSE). onEvent recebe { type: 'metric', source, row }
+  // ou { type: 'invalidate', source }; após uma reconexão chega um
+  // invalidate de source 'all', pois eventos podem ter sido perdidos.
+  // Retorna a função que encerra a conexão.
+  subscribeLive: (onEvent) => {
+    let source = null
+    let closed = false
+    let connected = false
+    let retryTimer = null
+
+    const open = () => {
+      const token = encodeURIComponent(localStorage.getItem('token') || '')
+      source = new EventSource(`${api.defaults.baseURL}/api/live/?token=${token}`)
+
+      source.onopen = () => {
+        if (connected) onEvent({ type: 'invalidate', source: 'all' })
+        connected = true
+      }
+
+      source.onmessage = (message) => onEvent(JSON.parse(message.data))
+
+      source.onerror = () => {
+        // CLOSED: o servidor recusou a conexão (token expirado); o navegador
+        // não tenta de novo sozinho
+        if (source.readyState !== EventSource.CLOSED || closed) return
+        retryTimer = setTimeout(async () => {
+          try {
+            await refreshAccessToken()
+          } catch (error) {
+            console.error('Erro ao renovar token das atualizações ao vivo:', error)
+          }
+          if (!closed) open()
+        }, LIVE_RECONNECT_DELAY)
+      }
+    }
+
+    open()
+
+    return () => {
+      closed = true
+      clearTimeout(retryTimer)
+      source?.close()
+    }
+  },
 }
 
 export default dashboardService